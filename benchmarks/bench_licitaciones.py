@@ -0,0 +1,229 @@
+"""Benchmark del panel sobre datos sintéticos escalados (1x, 10x, 100x...).
+
+Los datos sintéticos replican el parquet reducido: cada copia conserva las
+licitaciones, oferentes por licitación y distribución de rubros originales,
+con nuevos NroLicitacion y un número creciente (sublineal) de instituciones y
+proveedores distintos. Para cada escala se mide el tiempo y la memoria pico
+(tracemalloc) de la carga, el filtrado, los cálculos de cada sección y el
+dibujo de los gráficos (versiones simplificadas de los del panel, ver
+dibujar_secciones). Cada etapa se ejecuta dos veces: una para el tiempo
+y otra, con tracemalloc activo, para la memoria (el rastreo distorsiona los
+tiempos).
+
+Uso: python -m benchmarks.bench_licitaciones --escalas 1 10 100 --salida bench
+     (escribe bench.json y bench.csv)
+"""
+import argparse
+import csv
+import json
+import math
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import seaborn as sns
+
+from licitaciones import analisis
+from licitaciones.analisis import Filtro
+from licitaciones.carga import RUTA_DATOS, cargar_datos
+from licitaciones.cubo import construir_cubo
+from licitaciones.datos import ConjuntoDatos
+from licitaciones.filtros import TODOS
+from licitaciones.graficos import CacheGraficos
+from licitaciones.oferentes import construir_histogramas
+from licitaciones.resumen import ResumenAnual
+
+# Crecimiento de valores distintos respecto de la escala (k copias)
+EXPONENTE_PROVEEDORES = 0.7
+EXPONENTE_INSTITUCIONES = 0.5
+
+
+def _replicar(serie, copias, grupos):
+    """Categorical con `copias` repeticiones de `serie`; la copia c usa el sufijo c % grupos."""
+    codigos, valores = pd.factorize(serie)
+    copia = np.repeat(np.arange(copias), len(serie))
+    codigos = np.tile(codigos, copias)
+    if grupos == 1:
+        return pd.Categorical.from_codes(codigos, valores)
+    categorias = [f"{valor} #{g}" for valor in valores for g in range(grupos)]
+    nuevos = np.where(codigos >= 0, codigos * grupos + copia % grupos, -1)
+    return pd.Categorical.from_codes(nuevos, categorias)
+
+
+def generar_sintetico(escala, destino, base=RUTA_DATOS):
+    """Escribe un parquet con `escala` veces las filas de `base` y el mismo esquema."""
+    original = pd.read_parquet(base)
+    sintetico = {}
+    for col in original.columns:
+        if col == "NroLicitacion":
+            sintetico[col] = _replicar(original[col], escala, escala)
+        elif col == "Proveedor":
+            sintetico[col] = _replicar(original[col], escala, math.ceil(escala ** EXPONENTE_PROVEEDORES))
+        elif col == "Institucion":
+            sintetico[col] = _replicar(original[col], escala, math.ceil(escala ** EXPONENTE_INSTITUCIONES))
+        elif isinstance(original[col].dtype, pd.StringDtype) or original[col].dtype == object:
+            sintetico[col] = _replicar(original[col], escala, 1)
+        else:
+            sintetico[col] = np.tile(original[col].to_numpy(), escala)
+    tabla = pa.Table.from_pandas(pd.DataFrame(sintetico), preserve_index=False)
+    # Strings planos, como en el archivo real
+    tabla = tabla.cast(pa.schema([
+        pa.field(campo.name, campo.type.value_type if pa.types.is_dictionary(campo.type) else campo.type)
+        for campo in tabla.schema
+    ]))
+    pq.write_table(tabla, destino)
+    return tabla.num_rows
+
+
+class Medidor:
+    def __init__(self, escala, filas):
+        self.escala = escala
+        self.filas = filas
+        self.resultados = []
+
+    def medir(self, etapa, funcion, unidades=1):
+        """Tiempo (por unidad, p. ej. por filtro) y memoria pico de `funcion()`."""
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = (time.perf_counter() - inicio) / unidades
+
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.resultados.append({
+            "escala": self.escala,
+            "filas": self.filas,
+            "etapa": etapa,
+            "segundos": round(segundos, 6),
+            "pico_mb": round(pico / 1e6, 2),
+        })
+        print(f"  {etapa:<40} {segundos * 1000:>10.1f} ms  {pico / 1e6:>9.1f} MB")
+        return resultado
+
+
+def filtros_de_prueba(datos, n=20, semilla=0):
+    """Todos/Todos por año más combinaciones al azar de rubro e institución."""
+    rng = np.random.default_rng(semilla)
+    años = datos.opciones["Año"]
+    rubros = datos.opciones["RubroN1"]
+    munis = datos.opciones["Institucion"]
+    filtros = [Filtro(año) for año in años]
+    for _ in range(n):
+        año = años[rng.integers(len(años))]
+        rubro = rubros[rng.integers(len(rubros))] if rng.random() < 0.5 else TODOS
+        muni = munis[rng.integers(len(munis))] if rng.random() < 0.5 else TODOS
+        filtros.append(Filtro(año, rubro, muni))
+    return filtros
+
+
+def dibujar_secciones(datos, filtros):
+    """Dibuja (sin caché previa) los gráficos principales de cada sección.
+
+    Son aproximaciones: usan los mismos cálculos de `analisis` que el panel pero
+    no sus funciones de gráfico (que dependen de Streamlit), sin títulos,
+    leyendas ni colores. Los tiempos subestiman lo que cuesta dibujar en la app.
+    """
+    graficos = CacheGraficos()
+    for filtro in filtros:
+        def barras():
+            fig, ax = plt.subplots()
+            top = analisis.top_rubros(datos, filtro)
+            if not top.empty:
+                top.plot(kind="bar", ax=ax)
+            return fig
+
+        def torta():
+            fig, ax = plt.subplots(figsize=(6, 6))
+            top_fin = analisis.distribucion_financiamiento(datos, filtro)
+            if top_fin.sum() > 0:
+                ax.pie(top_fin, autopct="%1.1f%%", startangle=90)
+            return fig
+
+        def oferentes():
+            fig, ax = plt.subplots()
+            distribucion = analisis.distribucion_oferentes(datos, filtro)
+            sns.histplot(x=distribucion.oferentes, weights=distribucion.licitaciones, bins=30, ax=ax)
+            return fig
+
+        def plazos():
+            fig, ax = plt.subplots()
+            sns.histplot(analisis.estadisticas_plazo(datos, filtro).plazos, bins=30, ax=ax)
+            return fig
+
+        for nombre, dibujar in (("barras", barras), ("torta", torta), ("oferentes", oferentes), ("plazos", plazos)):
+            graficos.obtener((nombre, *filtro), dibujar)
+
+
+def precalcular(datos):
+    """Construye o lee las estructuras persistidas, como al abrir el panel."""
+    return datos.cubo, datos.oferentes, datos.resumen
+
+
+def ejecutar(escala, directorio, n_filtros=20):
+    ruta = Path(directorio) / f"sintetico_x{escala}.parquet"
+    filas = generar_sintetico(escala, ruta)
+    print(f"Escala {escala}x: {filas:,} filas")
+    medidor = Medidor(escala, filas)
+
+    medidor.medir("carga", lambda: cargar_datos(ruta))
+    datos = medidor.medir("conjunto (carga + índice)", lambda: ConjuntoDatos(ruta))
+    medidor.medir("cubo (construcción)", lambda: construir_cubo(datos.df))
+    medidor.medir("oferentes (construcción)", lambda: construir_histogramas(datos.df))
+    medidor.medir("resumen anual (construcción)", lambda: ResumenAnual().actualizar(datos.df))
+    precalcular(datos)
+
+    filtros = filtros_de_prueba(datos, n_filtros)
+
+    def filtrar_sin_cache():
+        datos.indice._cache.clear()
+        for filtro in filtros:
+            datos.filas(filtro)
+
+    medidor.medir("filtrado (por filtro)", filtrar_sin_cache, len(filtros))
+
+    secciones = {
+        "Gasto Público": lambda f: (analisis.top_rubros(datos, f), analisis.distribucion_financiamiento(datos, f)),
+        "Competitividad": lambda f: (analisis.distribucion_oferentes(datos, f), analisis.tamano_proveedor(datos, f)),
+        "Eficiencia": lambda f: analisis.estadisticas_plazo(datos, f),
+        "Transparencia": lambda f: (analisis.tipos_licitacion(datos, f), analisis.publicidad_ofertas(datos, f)),
+        "Municipios": lambda f: analisis.top_municipios(datos, f),
+    }
+    for seccion, calcular in secciones.items():
+        medidor.medir(f"sección {seccion} (por filtro)", lambda: [calcular(f) for f in filtros], len(filtros))
+    medidor.medir("sección Comparación entre años", lambda: analisis.resumen_anual(datos))
+
+    medidor.medir("gráficos (por filtro)", lambda: dibujar_secciones(datos, filtros), len(filtros))
+    return medidor.resultados
+
+
+def guardar_reporte(resultados, salida):
+    salida = Path(salida)
+    salida.with_suffix(".json").write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding="utf-8")
+    with open(salida.with_suffix(".csv"), "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=list(resultados[0]))
+        escritor.writeheader()
+        escritor.writerows(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--filtros", type=int, default=20, help="combinaciones de filtros al azar por escala")
+    parser.add_argument("--salida", default="bench_licitaciones", help="prefijo de los archivos .json y .csv")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for escala in args.escalas:
+            resultados += ejecutar(escala, directorio, args.filtros)
+    guardar_reporte(resultados, args.salida)
+    print(f"Reporte: {args.salida}.json / {args.salida}.csv")
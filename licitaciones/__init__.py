@@ -0,0 +1,8 @@
+"""Utilidades compartidas por los paneles de licitaciones.
+
+Los cálculos de cada sección están en `licitaciones.analisis` y no dependen
+de Streamlit; las apps solo dibujan sus resultados. El paquete no importa
+sus submódulos, para que cada CLI (`python -m licitaciones.cubo`, etc.)
+cargue solo lo que usa.
+"""
+from licitaciones.filtros import TODOS, IndiceFiltros
@@ -0,0 +1,165 @@
+"""Alertas de concentración y de proveedor único por (Año, Institucion, RubroN1).
+
+Indicadores de cada combinación:
+- HHI (0-10.000) de los montos adjudicados por Proveedor. Los datos solo
+  traen el monto estimado de la licitación: se reparte en partes iguales
+  entre sus proveedores ganadores del grupo, y las ofertas repetidas (mismo
+  NroLicitacion y Proveedor) cuentan una vez.
+- Tasa de licitaciones con un solo oferente.
+- Participación del proveedor principal en el monto estimado adjudicado.
+
+Todo se calcula con códigos enteros (factorize) y bincount, sin groupby por
+proveedor, y la tabla se guarda junto al parquet por versión de datos.
+
+Uso: python -m licitaciones.alertas [ruta] [--csv salida.csv]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from licitaciones.carga import RUTA_DATOS, cargar_datos, guardar_versionado, obtener_agregado, ruta_derivada, version_fijada
+from licitaciones.filtros import TODOS
+from licitaciones.oferentes import oferentes_por_licitacion, pares_sin_duplicados
+from licitaciones.perfil import registrar_filas
+
+DIMENSIONES = ["Año", "Institucion", "RubroN1"]
+MONTO = "MontoEstimadoLicitacion"
+GANADORAS = ["Ganadora", "Adjudicada"]
+
+# Umbrales de cada alerta; con menos licitaciones que MIN_LICITACIONES no se alerta
+UMBRAL_HHI = 2500  # mercado altamente concentrado
+UMBRAL_UNICO_OFERENTE = 0.5
+UMBRAL_PROVEEDOR_PRINCIPAL = 0.5
+MIN_LICITACIONES = 5
+# Cambia cuando cambia el cálculo: las tablas guardadas con otro formato se recalculan
+FORMATO = 2
+
+ALERTAS = {
+    "AlertaConcentracion": "Concentración (HHI)",
+    "AlertaUnicoOferente": "Proveedor único",
+    "AlertaProveedorPrincipal": "Proveedor dominante",
+}
+# Columnas que muestra el panel
+COLUMNAS = {
+    "Institucion": "Institución",
+    "RubroN1": "Rubro",
+    "Licitaciones": "Licitaciones",
+    "TasaUnicoOferente": "Un solo oferente (%)",
+    "MontoEstimadoAdjudicado": "Monto Estimado Adjudicado (CLP)",
+    "ProveedoresAdjudicados": "Proveedores Adjudicados",
+    "HHI": "HHI",
+    "ProveedorPrincipal": "Proveedor Principal",
+    "ParticipacionPrincipal": "Participación Principal (%)",
+}
+
+
+def ruta_alertas(ruta_datos=RUTA_DATOS):
+    return ruta_derivada(ruta_datos, ".alertas.parquet")
+
+
+def construir_alertas(df):
+    """Una fila por (Año, Institucion, RubroN1) con indicadores y alertas."""
+    agrupado = df.groupby(DIMENSIONES, observed=True, sort=True)
+    grupo = agrupado.ngroup().to_numpy()
+    tabla = agrupado.size().index.to_frame(index=False)
+    n = len(tabla)
+    licitacion, _ = pd.factorize(df["NroLicitacion"])
+    proveedor, proveedores = pd.factorize(df["Proveedor"], sort=True)
+    # Filas con dimensiones nulas (grupo -1) se descartan como nulos
+    licitacion = np.where(grupo >= 0, licitacion, -1)
+
+    # Oferentes distintos por licitación de cada grupo
+    grupo_lic, _, oferentes = oferentes_por_licitacion(grupo, licitacion, proveedor)
+    licitaciones = np.bincount(grupo_lic, minlength=n)
+    unico = np.bincount(grupo_lic, weights=oferentes == 1, minlength=n)
+
+    # Adjudicaciones: pares (grupo, licitación, proveedor) ganadores sin repetir
+    gana = df["ResultadoOferta"].isin(GANADORAS).to_numpy()
+    posiciones, inicio = pares_sin_duplicados(grupo, np.where(gana, licitacion, -1), proveedor)
+    g, p = grupo[posiciones], proveedor[posiciones]
+    monto = df[MONTO].to_numpy()[posiciones]
+
+    # Monto de cada licitación repartido en partes iguales entre sus ganadores del grupo
+    tramo = np.cumsum(inicio) - 1
+    monto = monto / np.bincount(tramo)[tramo]
+
+    # Monto por (grupo, proveedor) y participación de cada proveedor en su grupo
+    n_proveedores = max(len(proveedores), 1)
+    pares, inversa = np.unique(g.astype(np.int64) * n_proveedores + p, return_inverse=True)
+    monto_par = np.bincount(inversa, weights=monto, minlength=len(pares))
+    grupo_par, proveedor_par = pares // n_proveedores, pares % n_proveedores
+    total = np.bincount(grupo_par, weights=monto_par, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        participacion = np.where(total[grupo_par] > 0, monto_par / total[grupo_par], 0.0)
+    adjudicados = np.bincount(grupo_par, minlength=n)
+    hhi = np.bincount(grupo_par, weights=participacion ** 2, minlength=n) * 10_000
+
+    # Proveedor principal: el de mayor participación; en empates, el primero alfabéticamente
+    orden = np.lexsort((proveedor_par, -participacion, grupo_par))
+    primero = orden[np.flatnonzero(np.diff(grupo_par[orden], prepend=-1) != 0)]
+    principal = np.full(n, None, dtype=object)
+    participacion_principal = np.full(n, np.nan)
+    principal[grupo_par[primero]] = np.asarray(proveedores, dtype=object)[proveedor_par[primero]]
+    participacion_principal[grupo_par[primero]] = participacion[primero]
+
+    sin_monto = total <= 0
+    tabla["Año"] = tabla["Año"].astype("int16")
+    tabla["Institucion"] = tabla["Institucion"].astype(str)
+    tabla["RubroN1"] = tabla["RubroN1"].astype(str)
+    tabla["Licitaciones"] = licitaciones.astype(np.int64)
+    tabla["UnicoOferente"] = unico.astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tabla["TasaUnicoOferente"] = np.where(licitaciones > 0, unico / licitaciones, np.nan)
+    tabla["MontoEstimadoAdjudicado"] = np.rint(total).astype(np.int64)
+    tabla["ProveedoresAdjudicados"] = adjudicados.astype(np.int64)
+    tabla["HHI"] = np.where(sin_monto, np.nan, hhi)
+    tabla["ProveedorPrincipal"] = pd.array(np.where(sin_monto, None, principal), dtype="string")
+    tabla["ParticipacionPrincipal"] = np.where(sin_monto, np.nan, participacion_principal)
+
+    suficientes = tabla["Licitaciones"] >= MIN_LICITACIONES
+    tabla["AlertaConcentracion"] = suficientes & (tabla["HHI"] > UMBRAL_HHI)
+    tabla["AlertaUnicoOferente"] = suficientes & (tabla["TasaUnicoOferente"] >= UMBRAL_UNICO_OFERENTE)
+    tabla["AlertaProveedorPrincipal"] = suficientes & (tabla["ParticipacionPrincipal"] >= UMBRAL_PROVEEDOR_PRINCIPAL)
+    return tabla
+
+
+def obtener_alertas(df=None, ruta_datos=RUTA_DATOS, version=None, archivos=None):
+    """Tabla persistida para `version` o recalculada (un año a la vez si df=None)."""
+    return TablaAlertas(
+        obtener_agregado(construir_alertas, ruta_alertas(ruta_datos), version, df, ruta_datos, archivos, FORMATO)
+    )
+
+
+class TablaAlertas:
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self._con_alerta = tabla[list(ALERTAS)].any(axis=1).to_numpy()
+
+    def filtrar(self, año, rubro=TODOS, muni=TODOS, solo_alertas=True):
+        """Filas del filtro, de mayor a menor HHI; con `solo_alertas`, solo las que tienen alguna alerta."""
+        mascara = self.tabla["Año"].to_numpy() == int(año)
+        if rubro != TODOS:
+            mascara &= self.tabla["RubroN1"].to_numpy() == rubro
+        if muni != TODOS:
+            mascara &= self.tabla["Institucion"].to_numpy() == muni
+        if solo_alertas:
+            mascara &= self._con_alerta
+        registrar_filas(len(self.tabla))
+        return self.tabla[mascara].sort_values(["HHI", "MontoEstimadoAdjudicado"], ascending=False, kind="stable")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ruta", nargs="?", default=RUTA_DATOS)
+    parser.add_argument("--csv", help="escribe las combinaciones con alguna alerta en este CSV")
+    args = parser.parse_args()
+    version, archivos = version_fijada(args.ruta)
+    tabla = construir_alertas(cargar_datos(args.ruta, archivos))
+    guardar_versionado(tabla, version, ruta_alertas(args.ruta), FORMATO)
+    con_alerta = tabla[tabla[list(ALERTAS)].any(axis=1)]
+    print(f"{len(tabla):,} combinaciones, {len(con_alerta):,} con alguna alerta -> {ruta_alertas(args.ruta)}")
+    for columna, nombre in ALERTAS.items():
+        print(f"  {nombre}: {int(tabla[columna].sum()):,}")
+    if args.csv:
+        con_alerta.to_csv(args.csv, index=False)
@@ -0,0 +1,123 @@
+"""Cálculos de cada sección del panel, sin dependencias de Streamlit.
+
+Cada función recibe un ConjuntoDatos y un Filtro y retorna un resultado
+pequeño (Series o NamedTuple) listo para graficar.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from licitaciones.alertas import ALERTAS, COLUMNAS as COLUMNAS_ALERTAS
+from licitaciones.filtros import TODOS
+from licitaciones.perfil import medido
+from licitaciones.series import COLUMNAS as COLUMNAS_SERIES
+
+
+class Filtro(NamedTuple):
+    año: int
+    rubro: str = TODOS
+    muni: str = TODOS
+
+
+class DistribucionOferentes(NamedTuple):
+    oferentes: np.ndarray  # número de oferentes distintos
+    licitaciones: np.ndarray  # licitaciones con ese número de oferentes
+    proporcion_unico: float | None  # None si no hay licitaciones
+
+
+class EstadisticasPlazo(NamedTuple):
+    plazos: pd.Series  # días entre publicación y adjudicación (no nulos)
+    promedio: float
+    mediana: float
+
+
+class AlertasFiltro(NamedTuple):
+    tabla: pd.DataFrame  # una fila por (Institucion, RubroN1), de mayor a menor HHI
+    conteos: pd.Series  # combinaciones con cada alerta en el filtro
+
+
+@medido
+def top_rubros(datos, filtro, n=10):
+    return datos.cubo.monto_por("RubroN1", *filtro).head(n)
+
+
+@medido
+def top_municipios(datos, filtro, n=10):
+    return datos.cubo.monto_por("Institucion", *filtro).head(n)
+
+
+@medido
+def distribucion_financiamiento(datos, filtro, n=10):
+    """Las `n` fuentes con más filas y el resto agrupado en "Otros"."""
+    fuentes = datos.cubo.conteos("FuenteFinanciamiento", *filtro, relleno="Desconocido")
+    top_fin = fuentes.head(n).copy()
+    top_fin["Otros"] = fuentes[n:].sum()
+    return top_fin
+
+
+@medido
+def distribucion_oferentes(datos, filtro):
+    oferentes, licitaciones = datos.oferentes.histograma(*filtro)
+    return DistribucionOferentes(oferentes, licitaciones, datos.oferentes.proporcion_unico_oferente(*filtro))
+
+
+@medido
+def tamano_proveedor(datos, filtro):
+    """% de ofertas adjudicadas por tamaño de proveedor (vacío si no hay adjudicaciones)."""
+    return datos.cubo.conteos("TamanoProveedor", *filtro, normalize=True) * 100
+
+
+@medido
+def tipos_licitacion(datos, filtro):
+    return datos.cubo.conteos("TipoLicitacion", *filtro)
+
+
+@medido
+def publicidad_ofertas(datos, filtro):
+    return datos.cubo.conteos("PublicidadOfertasTecnicas", *filtro)
+
+
+@medido
+def estadisticas_plazo(datos, filtro):
+    plazos = datos.filas(filtro, ["Plazo"])["Plazo"].dropna()
+    return EstadisticasPlazo(plazos, plazos.mean(), plazos.median())
+
+
+@medido
+def resumen_anual(datos):
+    """Tabla por año de la sección de comparación (excluye plazos nulos o negativos)."""
+    resumen = datos.resumen.tabla()
+    resumen["Plazo Promedio (días)"] = resumen["Plazo Promedio (días)"].round(2)
+    resumen["Total Monto Estimado (CLP)"] = resumen["Total Monto Estimado (CLP)"].astype(int)
+    return resumen
+
+
+@medido
+def alertas(datos, filtro, solo_alertas=True):
+    """Indicadores de concentración del filtro, con las alertas de cada fila como texto."""
+    filas = datos.alertas.filtrar(*filtro, solo_alertas=False)
+    conteos = filas[list(ALERTAS)].sum().rename(ALERTAS).astype(int)
+    if solo_alertas:
+        filas = filas[filas[list(ALERTAS)].any(axis=1)]
+    tabla = filas[list(COLUMNAS_ALERTAS)].rename(columns=COLUMNAS_ALERTAS)
+    tabla["Un solo oferente (%)"] *= 100
+    tabla["Participación Principal (%)"] *= 100
+    tabla["Alertas"] = [
+        ", ".join(nombre for columna, nombre in ALERTAS.items() if fila[columna])
+        for fila in filas[list(ALERTAS)].to_dict("records")
+    ]
+    return AlertasFiltro(tabla, conteos)
+
+
+@medido
+def meses_disponibles(datos):
+    """Meses con adjudicaciones en los datos, para elegir el rango de la serie."""
+    return datos.series.meses
+
+
+@medido
+def serie_mensual(datos, filtro, desde=None, hasta=None):
+    """Monto, licitaciones y mediana de plazo por mes entre `desde` y `hasta` (el año del filtro no aplica)."""
+    serie = datos.series.serie(filtro.rubro, filtro.muni, desde, hasta)
+    return serie.rename(columns=COLUMNAS_SERIES)
@@ -0,0 +1,309 @@
+"""Carga tipada y versión del conjunto de datos.
+
+`cargar_datos` lee solo las columnas que usa el panel, con strings como
+categorías (diccionario), numéricos reducidos y fechas como datetime64, y
+agrega las columnas derivadas (Plazo, PlazoValido) una sola vez por carga.
+
+La ruta de datos puede ser un archivo parquet o un directorio particionado
+(ver licitaciones.particiones); se configura con LICITACIONES_DATOS.
+
+Uso: python -m licitaciones.carga [ruta]   (reporte de memoria)
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+RUTA_DATOS = os.environ.get("LICITACIONES_DATOS", "data_licitaciones_2023_2024_reducido.parquet")
+
+# Columnas que usa el panel y su tipo en memoria
+ESQUEMA = {
+    "NroLicitacion": "category",
+    "MontoEstimadoLicitacion": "int64",  # se suma: int64 evita desbordes
+    "FuenteFinanciamiento": "category",
+    "RubroN1": "category",
+    "Proveedor": "category",
+    "ResultadoOferta": "category",
+    "TamanoProveedor": "category",
+    "FechaPublicacion": "datetime64[ns]",
+    "FechaAdjudicacion": "datetime64[ns]",
+    "TipoLicitacion": "category",
+    "PublicidadOfertasTecnicas": "category",
+    "Institucion": "category",
+    "Año": "int16",
+}
+# Columnas calculadas en la carga y las de ESQUEMA de que dependen
+DERIVADAS = {
+    "Plazo": ["FechaPublicacion", "FechaAdjudicacion"],
+    "PlazoValido": ["FechaPublicacion", "FechaAdjudicacion"],
+}
+CLAVE_HUELLA = b"licitaciones.huella"
+CLAVE_FORMATO = b"licitaciones.formato"
+# En un directorio se ignoran rutas que empiezan con estos prefijos (igual que pyarrow.dataset)
+PREFIJOS_OCULTOS = ("_", ".")
+# Mientras exista, contiene la versión que se sigue publicando y sus archivos (ver licitaciones.ingesta)
+MARCA_INGESTA = Path("_ingesta") / "VERSION"
+
+
+def es_particionado(ruta=RUTA_DATOS):
+    return os.path.isdir(ruta)
+
+
+def archivos_datos(ruta=RUTA_DATOS, publicados=True):
+    """Archivos parquet del directorio que forman parte del conjunto, ordenados.
+
+    Durante una ingesta se retornan los de la versión publicada (los de la
+    marca); con `publicados=False`, los que hay en el directorio.
+    """
+    base = Path(ruta)
+    marca = leer_marca(base) if publicados else None
+    if marca is not None:
+        return marca[1]
+    return [
+        archivo for archivo in sorted(base.rglob("*.parquet"))
+        if not any(parte.startswith(PREFIJOS_OCULTOS) for parte in archivo.relative_to(base).parts)
+    ]
+
+
+def huella(ruta=RUTA_DATOS):
+    """Identificador de versión (tamaño + fecha de modificación de cada archivo).
+
+    Durante una ingesta se mantiene la versión anterior hasta que todos los
+    archivos nuevos están en su lugar.
+    """
+    if not es_particionado(ruta):
+        info = os.stat(ruta)
+        return f"{info.st_size:x}-{info.st_mtime_ns:x}"
+    marca = leer_marca(ruta)
+    return marca[0] if marca is not None else huella_archivos(ruta)
+
+
+def huella_archivos(ruta, archivos=None):
+    """Huella de los archivos del directorio, o de `archivos` ({ruta relativa: archivo}).
+
+    Con `archivos` se puede calcular la versión antes de mover los archivos a
+    su lugar: renombrarlos conserva tamaño y fecha de modificación.
+    """
+    if archivos is None:
+        archivos = {archivo.relative_to(ruta): archivo for archivo in archivos_datos(ruta, publicados=False)}
+    resumen = hashlib.sha1()
+    for relativa, archivo in sorted(archivos.items()):
+        info = Path(archivo).stat()
+        resumen.update(f"{relativa}:{info.st_size}:{info.st_mtime_ns};".encode())
+    return resumen.hexdigest()[:16]
+
+
+def version_fijada(ruta=RUTA_DATOS):
+    """(versión, archivos) de los datos actuales, obtenidos juntos; archivos es None para un archivo único.
+
+    Quien construye un agregado debe etiquetarlo con la versión de los datos
+    que leyó: se fija una vez al abrir el conjunto y se pasa hacia abajo.
+    """
+    if not es_particionado(ruta):
+        return huella(ruta), None
+    marca = leer_marca(ruta)
+    if marca is not None:
+        return marca
+    archivos = archivos_datos(ruta, publicados=False)
+    return huella_archivos(ruta, {archivo.relative_to(ruta): archivo for archivo in archivos}), archivos
+
+
+def marcar_ingesta(ruta, version, archivos):
+    """Fija la versión publicada y sus archivos mientras dura una ingesta."""
+    marca = Path(ruta) / MARCA_INGESTA
+    temporal = marca.with_suffix(".tmp")
+    lineas = [version, *(Path(archivo).relative_to(ruta).as_posix() for archivo in archivos)]
+    temporal.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    temporal.replace(marca)
+
+
+def leer_marca(ruta):
+    """(versión, archivos) fijados por una ingesta en curso, o None si no hay ninguna."""
+    try:
+        version, *archivos = (Path(ruta) / MARCA_INGESTA).read_text(encoding="utf-8").splitlines()
+    except (FileNotFoundError, ValueError):
+        return None
+    return version.strip(), [Path(ruta) / archivo for archivo in archivos]
+
+
+def abrir_dataset(ruta=RUTA_DATOS, archivos=None):
+    """pyarrow.dataset del archivo, de los archivos publicados del directorio o de `archivos`."""
+    if archivos is None and es_particionado(ruta):
+        archivos = archivos_datos(ruta)
+    if archivos is None:
+        return ds.dataset(ruta, format="parquet", partitioning="hive")
+    return ds.dataset([str(archivo) for archivo in archivos], format="parquet", partitioning="hive", partition_base_dir=str(ruta))
+
+
+def ruta_derivada(ruta_datos, sufijo):
+    """Archivo precalculado junto a los datos, p. ej. <datos>.cubo.parquet."""
+    ruta = Path(ruta_datos)
+    return ruta.with_name(ruta.stem + sufijo)
+
+
+def guardar_versionado(df, version, ruta, formato=None):
+    """Guarda `df` en parquet marcado con la versión de los datos de origen (y el formato de la tabla)."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[CLAVE_HUELLA] = version.encode()
+    if formato is not None:
+        metadatos[CLAVE_FORMATO] = str(formato).encode()
+    try:
+        pq.write_table(tabla.replace_schema_metadata(metadatos), ruta)
+    except OSError:
+        pass  # Sin permisos de escritura: se usa solo en memoria
+
+
+def leer_versionado(version, ruta, formato=None):
+    """Parquet guardado con `guardar_versionado` si corresponde a `version` y `formato`; si no, None.
+
+    El formato permite descartar tablas guardadas por un cálculo anterior.
+    """
+    try:
+        tabla = pq.read_table(ruta)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadatos = tabla.schema.metadata or {}
+    if metadatos.get(CLAVE_HUELLA) != version.encode():
+        return None
+    if formato is not None and metadatos.get(CLAVE_FORMATO) != str(formato).encode():
+        return None
+    return tabla.to_pandas()
+
+
+def obtener_agregado(construir, ruta, version=None, df=None, ruta_datos=RUTA_DATOS, archivos=None, formato=None):
+    """Agregado guardado en `ruta` para `version`, o construido con `construir` y guardado con ella.
+
+    `version` debe ser la de los datos de que se construye: `df` o, si es
+    None, los `archivos` del conjunto particionado, leídos un año a la vez.
+    Sin `version` se fijan la versión y los archivos actuales.
+    """
+    if version is None:
+        version, archivos = version_fijada(ruta_datos)
+    tabla = leer_versionado(version, ruta, formato)
+    if tabla is None:
+        partes = [df] if df is not None else leer_por_año(ruta_datos, archivos)
+        tabla = pd.concat([construir(parte) for parte in partes], ignore_index=True)
+        guardar_versionado(tabla, version, ruta, formato)
+    return tabla
+
+
+def leer_por_año(ruta=RUTA_DATOS, archivos=None):
+    """DataFrames del conjunto, uno por año (para construir agregados sin cargarlo completo)."""
+    dataset = abrir_dataset(ruta, archivos)
+    años = pc.unique(dataset.to_table(columns=["Año"]).column("Año")).drop_null().to_pylist()
+    for año in sorted(años):
+        yield tabla_a_pandas(dataset.to_table(columns=list(ESQUEMA), filter=ds.field("Año") == año))
+
+
+def cargar_datos(ruta=RUTA_DATOS, archivos=None):
+    tabla = abrir_dataset(ruta, archivos).to_table(columns=list(ESQUEMA))
+    return tabla_a_pandas(tabla)
+
+
+def columnas_origen(columnas=None):
+    """Columnas de ESQUEMA que hay que leer para obtener `columnas` (todas si es None)."""
+    if columnas is None:
+        return list(ESQUEMA)
+    necesarias = set()
+    for col in columnas:
+        necesarias.update(DERIVADAS.get(col, [col]))
+    return [col for col in ESQUEMA if col in necesarias]
+
+
+def tabla_a_pandas(tabla):
+    """Tabla de arrow -> DataFrame con ESQUEMA y columnas derivadas.
+
+    La tabla puede traer solo algunas columnas de ESQUEMA; las derivadas se
+    agregan si están sus columnas de origen.
+    """
+    for col, tipo in ESQUEMA.items():
+        i = tabla.schema.get_field_index(col)
+        if i < 0:
+            continue
+        columna = tabla.column(i)
+        if tipo == "category" and not pa.types.is_dictionary(columna.type):
+            # Codificar en arrow evita crear un objeto str por fila en pandas
+            tabla = tabla.set_column(i, col, columna.dictionary_encode())
+    return agregar_derivadas(aplicar_esquema(tabla.to_pandas()))
+
+
+def aplicar_esquema(df):
+    """Convierte las columnas de ESQUEMA presentes en `df` a sus tipos."""
+    df = df[[col for col in ESQUEMA if col in df]].copy()
+    for col in df:
+        tipo = ESQUEMA[col]
+        if tipo == "category":
+            serie = df[col].astype("category")
+            # Categorías ordenadas alfabéticamente y sin valores no observados
+            serie = serie.cat.remove_unused_categories()
+            df[col] = serie.cat.reorder_categories(sorted(serie.cat.categories))
+        elif tipo.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col], errors="coerce").astype(tipo)
+        else:
+            df[col] = df[col].astype(tipo)
+    return df
+
+
+def agregar_derivadas(df):
+    """Plazo en días entre publicación y adjudicación, y si es utilizable (no nulo, >= 0)."""
+    if not all(col in df for col in DERIVADAS["Plazo"]):
+        return df
+    df["Plazo"] = (df["FechaAdjudicacion"] - df["FechaPublicacion"]).dt.days.astype("float64")
+    df["PlazoValido"] = df["Plazo"].notna() & (df["Plazo"] >= 0)
+    return df
+
+
+def bytes_dataframe(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+class CacheBytes:
+    """LRU compartido entre hilos y acotado a `max_bytes`; `tamaño(valor)` da los bytes de cada entrada."""
+
+    def __init__(self, max_bytes, tamaño=bytes_dataframe):
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self._tamaño = tamaño
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        """Valor de `clave`; si no está, se calcula (fuera del lock) con `calcular()` y se guarda."""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave][0]
+        valor = calcular()
+        tamaño = self._tamaño(valor)
+        with self._lock:
+            if clave not in self._entradas and tamaño <= self.max_bytes:
+                self._entradas[clave] = (valor, tamaño)
+                self.bytes_usados += tamaño
+                while self.bytes_usados > self.max_bytes:
+                    _, (_, descartado) = self._entradas.popitem(last=False)
+                    self.bytes_usados -= descartado
+        return valor
+
+
+def reporte_memoria(ruta=RUTA_DATOS):
+    """Memoria (bytes) de la lectura por defecto versus la carga tipada."""
+    antes = pd.read_parquet(ruta).memory_usage(deep=True).sum()
+    despues = cargar_datos(ruta).memory_usage(deep=True).sum()
+    return {"antes": int(antes), "despues": int(despues), "reduccion": antes / despues}
+
+
+if __name__ == "__main__":
+    ruta_datos = sys.argv[1] if len(sys.argv) > 1 else RUTA_DATOS
+    reporte = reporte_memoria(ruta_datos)
+    print(f"Lectura por defecto: {reporte['antes'] / 1e6:,.1f} MB")
+    print(f"Carga tipada:        {reporte['despues'] / 1e6:,.1f} MB")
+    print(f"Reducción:           {reporte['reduccion']:.1f}x")
@@ -0,0 +1,160 @@
+"""Cubo de agregados por (Año, RubroN1, Institucion).
+
+Las secciones Gasto Público, Municipios, Transparencia y Competitividad
+solo necesitan sumas y conteos; el cubo los guarda pre-agregados junto al
+parquet para no recorrer las filas crudas en cada rerun.
+
+Uso: python -m licitaciones.cubo [ruta.parquet]
+"""
+import sys
+
+import pandas as pd
+
+from licitaciones.carga import RUTA_DATOS, cargar_datos, guardar_versionado, obtener_agregado, ruta_derivada, version_fijada
+from licitaciones.filtros import TODOS, IndiceFiltros
+from licitaciones.perfil import registrar_filas
+
+DIMENSIONES = ["Año", "RubroN1", "Institucion"]
+MONTO = "MontoEstimadoLicitacion"
+# Columna categórica -> condición (columna, valor) que deben cumplir las filas contadas
+MEDIDAS_CONTEO = {
+    "FuenteFinanciamiento": None,
+    "TipoLicitacion": None,
+    "PublicidadOfertasTecnicas": None,
+    "TamanoProveedor": ("ResultadoOferta", "Adjudicada"),
+}
+
+
+def ruta_cubo(ruta_datos=RUTA_DATOS):
+    return ruta_derivada(ruta_datos, ".cubo.parquet")
+
+
+def construir_cubo(df):
+    """Cubo en formato largo: una fila por (dimensiones, medida, categoria)."""
+    monto = (
+        df.groupby(DIMENSIONES, dropna=False, observed=True)[MONTO]
+        .agg(monto="sum", conteo="size")
+        .reset_index()
+    )
+    monto["medida"] = MONTO
+    monto["categoria"] = None
+    partes = [monto]
+
+    for medida, condicion in MEDIDAS_CONTEO.items():
+        filas = df
+        if condicion is not None:
+            columna, valor = condicion
+            filas = df[df[columna] == valor]
+        conteo = (
+            filas.groupby(DIMENSIONES + [medida], dropna=False, observed=True)
+            .size()
+            .rename("conteo")
+            .reset_index()
+            .rename(columns={medida: "categoria"})
+        )
+        conteo["medida"] = medida
+        conteo["monto"] = 0
+        partes.append(conteo)
+
+    cubo = pd.concat(partes, ignore_index=True)
+    cubo["categoria"] = cubo["categoria"].astype("string")
+    cubo["medida"] = cubo["medida"].astype("category")
+    return cubo[DIMENSIONES + ["medida", "categoria", "monto", "conteo"]]
+
+
+def obtener_cubo(df=None, ruta_datos=RUTA_DATOS, version=None, archivos=None):
+    """Lee el cubo persistido o lo reconstruye (y guarda) si los datos cambiaron.
+
+    Con `df=None` (conjunto particionado) se construye un año a la vez.
+    """
+    return CuboAgregados(obtener_agregado(construir_cubo, ruta_cubo(ruta_datos), version, df, ruta_datos, archivos))
+
+
+class CuboAgregados:
+    def __init__(self, cubo):
+        self.cubo = cubo
+        self._por_medida = {medida: filas for medida, filas in cubo.groupby("medida", observed=True)}
+
+    def _filtrar(self, medida, año, rubro=TODOS, muni=TODOS):
+        filas = self._por_medida.get(medida, self.cubo.iloc[0:0])
+        registrar_filas(len(filas))
+        mascara = filas["Año"] == año
+        if rubro != TODOS:
+            mascara &= filas["RubroN1"] == rubro
+        if muni != TODOS:
+            mascara &= filas["Institucion"] == muni
+        return filas[mascara]
+
+    def monto_por(self, columna, año, rubro=TODOS, muni=TODOS):
+        """Equivalente a df.groupby(columna)[MONTO].sum(), ordenado de mayor a menor."""
+        filas = self._filtrar(MONTO, año, rubro, muni)
+        total = filas.groupby(columna, observed=True)["monto"].sum().rename(MONTO)
+        return _ordenar(total)
+
+    def conteos(self, medida, año, rubro=TODOS, muni=TODOS, relleno=None, normalize=False):
+        """Equivalente a value_counts() de la medida; `relleno` reemplaza los nulos."""
+        filas = self._filtrar(medida, año, rubro, muni)
+        categorias = filas["categoria"]
+        if relleno is not None:
+            categorias = categorias.fillna(relleno)
+        conteo = filas["conteo"].groupby(categorias.rename(medida)).sum().rename("count")
+        conteo = _ordenar(conteo[conteo > 0])
+        if normalize:
+            conteo = (conteo / conteo.sum()).rename("proportion")
+        return conteo
+
+
+def _ordenar(serie):
+    return serie.sort_index().sort_values(ascending=False, kind="stable")
+
+
+def verificar_cubo(df, agregados):
+    """Compara el cubo contra el cálculo sobre filas crudas; retorna las diferencias."""
+    diferencias = []
+    indice = IndiceFiltros(df)
+    combinaciones = []
+    for año in sorted(df["Año"].unique()):
+        combinaciones.append((año, TODOS, TODOS))
+        combinaciones += [(año, rubro, TODOS) for rubro in df["RubroN1"].dropna().unique()]
+        combinaciones += [(año, TODOS, muni) for muni in df["Institucion"].dropna().unique()]
+
+    for año, rubro, muni in combinaciones:
+        filas = indice.filtrar(año, rubro, muni)
+        esperado = {
+            "RubroN1": filas.groupby("RubroN1", observed=True)[MONTO].sum(),
+            "Institucion": filas.groupby("Institucion", observed=True)[MONTO].sum(),
+            "FuenteFinanciamiento": filas["FuenteFinanciamiento"].astype("string").fillna("Desconocido").value_counts(),
+            "TipoLicitacion": filas["TipoLicitacion"].value_counts(),
+            "PublicidadOfertasTecnicas": filas["PublicidadOfertasTecnicas"].value_counts(),
+            "TamanoProveedor": filas.loc[filas["ResultadoOferta"] == "Adjudicada", "TamanoProveedor"].value_counts(),
+        }
+        obtenido = {
+            "RubroN1": agregados.monto_por("RubroN1", año, rubro, muni),
+            "Institucion": agregados.monto_por("Institucion", año, rubro, muni),
+            "FuenteFinanciamiento": agregados.conteos("FuenteFinanciamiento", año, rubro, muni, relleno="Desconocido"),
+            "TipoLicitacion": agregados.conteos("TipoLicitacion", año, rubro, muni),
+            "PublicidadOfertasTecnicas": agregados.conteos("PublicidadOfertasTecnicas", año, rubro, muni),
+            "TamanoProveedor": agregados.conteos("TamanoProveedor", año, rubro, muni),
+        }
+        for nombre, serie in esperado.items():
+            a = (serie if nombre in ("RubroN1", "Institucion") else serie[serie > 0]).sort_index()
+            b = obtenido[nombre].sort_index()
+            if list(map(str, a.index)) != list(map(str, b.index)) or list(a.to_numpy()) != list(b.to_numpy()):
+                diferencias.append(f"{nombre} ({año}, {rubro}, {muni})")
+    return diferencias
+
+
+if __name__ == "__main__":
+    ruta_datos = sys.argv[1] if len(sys.argv) > 1 else RUTA_DATOS
+    version, archivos = version_fijada(ruta_datos)
+    datos = cargar_datos(ruta_datos, archivos)
+    agregados = CuboAgregados(construir_cubo(datos))
+    guardar_versionado(agregados.cubo, version, ruta_cubo(ruta_datos))
+    print(f"Cubo: {len(agregados.cubo):,} filas (datos: {len(datos):,} filas) -> {ruta_cubo(ruta_datos)}")
+    diferencias = verificar_cubo(datos, agregados)
+    if diferencias:
+        print(f"{len(diferencias)} diferencias contra el cálculo crudo:")
+        for diferencia in diferencias[:20]:
+            print("  -", diferencia)
+        sys.exit(1)
+    print("Consistencia verificada contra el cálculo crudo.")
@@ -0,0 +1,99 @@
+"""Conjunto de datos cargado y sus estructuras precalculadas, por versión."""
+import os
+from functools import cached_property
+
+from licitaciones.alertas import obtener_alertas
+from licitaciones.carga import RUTA_DATOS, CacheBytes, cargar_datos, huella, version_fijada
+from licitaciones.cubo import obtener_cubo
+from licitaciones.filtros import IndiceFiltros
+from licitaciones.oferentes import obtener_histogramas
+from licitaciones.particiones import leer_particiones, opciones_particionadas
+from licitaciones.perfil import registrar_filas
+from licitaciones.resumen import obtener_resumen
+from licitaciones.series import obtener_series
+
+# "pandas" (en memoria) o "duckdb" (SQL sobre el parquet, ver licitaciones.sql)
+BACKEND = os.environ.get("LICITACIONES_BACKEND", "pandas")
+
+
+class ConjuntoDatos:
+    """Datos de una versión: filas filtrables, cubo, histogramas de oferentes, resumen anual,
+    alertas y series mensuales.
+
+    Con un directorio particionado no se mantiene el DataFrame completo; las
+    filas de cada filtro se leen con pushdown (solo las columnas pedidas) y se
+    guardan en un LRU acotado a `max_bytes`.
+    La versión y la lista de archivos se fijan al crear el conjunto y se pasan
+    a cada estructura precalculada: si los datos cambian después, lo que se
+    construya se guarda con la versión de los datos que realmente se leyeron.
+    """
+
+    def __init__(self, ruta=RUTA_DATOS, max_bytes=256 * 1024 * 1024):
+        self.ruta = ruta
+        self.version, self._archivos = version_fijada(ruta)
+        self.particionado = self._archivos is not None
+        self.indice = None
+        if not self.particionado:
+            df = cargar_datos(ruta)
+            # Si el archivo se reemplazó durante la carga, se vuelve a leer
+            while huella(ruta) != self.version:
+                self.version = huella(ruta)
+                df = cargar_datos(ruta)
+            self.indice = IndiceFiltros(df)
+        self._filas = CacheBytes(max_bytes)
+
+    @property
+    def df(self):
+        """DataFrame completo, o None si los datos están particionados."""
+        return None if self.indice is None else self.indice.df
+
+    @cached_property
+    def opciones(self):
+        if self.particionado:
+            return opciones_particionadas(self.ruta, self._archivos)
+        return self.indice.opciones
+
+    @cached_property
+    def cubo(self):
+        return obtener_cubo(self.df, self.ruta, self.version, self._archivos)
+
+    @cached_property
+    def oferentes(self):
+        return obtener_histogramas(self.df, self.ruta, self.version, self._archivos)
+
+    @cached_property
+    def resumen(self):
+        return obtener_resumen(self.df, self.ruta, version=self.version, archivos=self._archivos)
+
+    @cached_property
+    def alertas(self):
+        return obtener_alertas(self.df, self.ruta, self.version, self._archivos)
+
+    @cached_property
+    def series(self):
+        return obtener_series(self.df, self.ruta, self.version, self._archivos)
+
+    def filas(self, filtro, columnas=None):
+        """Filas que cumplen el filtro (solo lectura); con `columnas`, solo esas."""
+        if self.particionado:
+            filas = self._leer(filtro, None if columnas is None else tuple(columnas))
+        else:
+            filas = self.indice.filtrar(*filtro)
+            filas = filas if columnas is None else filas[list(columnas)]
+        registrar_filas(len(filas))
+        return filas
+
+    def _leer(self, filtro, columnas):
+        return self._filas.obtener(
+            (filtro, columnas),
+            lambda: leer_particiones(self.ruta, *filtro, archivos=self._archivos, columnas=columnas),
+        )
+
+
+def abrir_conjunto(ruta=RUTA_DATOS, backend=BACKEND):
+    if backend == "duckdb":
+        from licitaciones.sql import ConjuntoDuckDB
+        return ConjuntoDuckDB(ruta)
+    if backend != "pandas":
+        raise ValueError(f"LICITACIONES_BACKEND desconocido: {backend!r}")
+    return ConjuntoDatos(ruta)
@@ -0,0 +1,79 @@
+"""Motor de filtros por Año / RubroN1 / Institucion.
+
+Los índices posicionales se calculan una sola vez por carga de datos; cada
+combinación de filtros se resuelve intersectando arreglos de posiciones en
+lugar de copiar el DataFrame y evaluar máscaras sobre todas las filas.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+TODOS = "Todos"
+COLUMNAS_FILTRO = ("Año", "RubroN1", "Institucion")
+
+
+class IndiceFiltros:
+    def __init__(self, df, max_cache=64):
+        # Ordenar por año deja cada año como un bloque contiguo: filtrar solo por
+        # año es un slice posicional, sin copiar filas.
+        años = df["Año"].to_numpy()
+        orden = np.argsort(años, kind="stable")
+        if (orden != np.arange(len(orden))).any():
+            df = df.take(orden)
+        self.df = df.reset_index(drop=True)
+
+        self.opciones = {}
+        self._grupos = {}
+        for col in COLUMNAS_FILTRO:
+            codigos, valores = pd.factorize(self.df[col], sort=True)
+            # Posiciones agrupadas por código; dentro de cada grupo quedan ordenadas
+            orden = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+            self._grupos[col] = {
+                valor: orden[limites[i]:limites[i + 1]] for i, valor in enumerate(valores)
+            }
+            self.opciones[col] = list(valores)
+
+        self._rangos_año = {}
+        for año, posiciones in self._grupos["Año"].items():
+            self._rangos_año[año] = (int(posiciones[0]), int(posiciones[-1]) + 1)
+
+        self._max_cache = max_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def posiciones(self, año, rubro=TODOS, muni=TODOS):
+        """Posiciones (ordenadas) de las filas que cumplen los filtros."""
+        inicio, fin = self._rangos_año.get(año, (0, 0))
+        resultado = None
+        for col, valor in (("RubroN1", rubro), ("Institucion", muni)):
+            if valor == TODOS:
+                continue
+            grupo = self._grupos[col].get(valor, np.empty(0, dtype=np.intp))
+            a, b = np.searchsorted(grupo, [inicio, fin])
+            grupo = grupo[a:b]
+            resultado = grupo if resultado is None else np.intersect1d(resultado, grupo, assume_unique=True)
+        if resultado is None:
+            return np.arange(inicio, fin)
+        return resultado
+
+    def filtrar(self, año, rubro=TODOS, muni=TODOS):
+        """Subconjunto filtrado; debe tratarse como solo lectura (se comparte entre sesiones)."""
+        if rubro == TODOS and muni == TODOS:
+            inicio, fin = self._rangos_año.get(año, (0, 0))
+            return self.df.iloc[inicio:fin]
+
+        clave = (año, rubro, muni)
+        with self._lock:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                return self._cache[clave]
+
+        subconjunto = self.df.take(self.posiciones(año, rubro, muni))
+        with self._lock:
+            self._cache[clave] = subconjunto
+            while len(self._cache) > self._max_cache:
+                self._cache.popitem(last=False)
+        return subconjunto
@@ -0,0 +1,47 @@
+"""Caché de gráficos renderizados (bytes PNG/SVG) compartida entre sesiones.
+
+Cada gráfico se identifica con una clave (sección, gráfico, año, rubro,
+municipio, versión de datos). En un acierto no se ejecuta matplotlib; en un
+fallo se dibuja, se guarda y la figura se cierra explícitamente.
+"""
+import io
+import threading
+
+import matplotlib.pyplot as plt
+
+from licitaciones.carga import CacheBytes
+
+# Mismos parámetros que usa st.pyplot al guardar la figura
+OPCIONES_GUARDADO = {"bbox_inches": "tight", "dpi": 200}
+
+
+def clave_grafico(seccion, grafico, filtro, version):
+    return (seccion, grafico, *filtro, version)
+
+
+class CacheGraficos:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self._imagenes = CacheBytes(max_bytes, len)
+        # pyplot mantiene estado global: se dibuja una figura a la vez
+        self._lock_dibujo = threading.Lock()
+
+    def obtener(self, clave, dibujar, formato="png"):
+        """Bytes del gráfico `clave`; `dibujar()` debe retornar la figura si no está en caché."""
+        return self._imagenes.obtener((*clave, formato), lambda: self._renderizar(dibujar, formato))
+
+    def _renderizar(self, dibujar, formato):
+        with self._lock_dibujo:
+            abiertas = set(plt.get_fignums())
+            try:
+                fig = dibujar()
+            except Exception:
+                # Sin figura retornada: se cierran las que alcanzó a crear
+                for numero in set(plt.get_fignums()) - abiertas:
+                    plt.close(numero)
+                raise
+            try:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format=formato, **OPCIONES_GUARDADO)
+            finally:
+                plt.close(fig)
+        return buffer.getvalue()
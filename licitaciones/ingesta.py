@@ -0,0 +1,262 @@
+"""Ingesta incremental de extractos nuevos (CSV o parquet) en un directorio particionado.
+
+El extracto se lee por bloques de FILAS_POR_BLOQUE filas. Cada bloque se
+valida y normaliza a ESQUEMA (los textos se guardan tal cual, como en la
+carga) y se escribe en `_ingesta/`, que pyarrow y `huella` ignoran.
+
+El conjunto tiene filas idénticas repetidas, así que no se descartan todas
+las repeticiones: una fila se agrega solo si el extracto trae más copias de
+ella (todas las columnas iguales) que las que ya hay en el conjunto. Volver a
+ingerir un extracto no agrega nada. Las copias existentes se cuentan solo en
+las particiones de los años que trae el extracto, a medida que aparecen.
+
+Antes de mover los archivos nuevos a sus particiones se guardan los
+agregados de la versión nueva:
+
+- cubo: se suman los agregados de las filas nuevas;
+- resumen anual: se agregan solo los archivos nuevos;
+- histogramas de oferentes, alertas y series mensuales: se recalculan los
+  años afectados con los archivos publicados más los nuevos.
+
+Al empezar, `_ingesta/VERSION` fija la versión publicada y su lista de
+archivos; `huella`, `archivos_datos` y todas las lecturas la respetan aunque
+los archivos nuevos ya estén en las particiones. Al borrarla, la app pasa a
+la versión nueva en el siguiente rerun, con los agregados ya guardados. Las
+imágenes de la versión anterior salen de la caché por LRU, sin vaciarla.
+
+Uso: python -m licitaciones.ingesta extracto.csv [otro.parquet ...] [--destino dir]
+"""
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from licitaciones.alertas import FORMATO as FORMATO_ALERTAS, construir_alertas, ruta_alertas
+from licitaciones.carga import (
+    ESQUEMA, MARCA_INGESTA, RUTA_DATOS, abrir_dataset, archivos_datos, es_particionado, guardar_versionado, huella,
+    huella_archivos, leer_versionado, marcar_ingesta, tabla_a_pandas,
+)
+from licitaciones.cubo import DIMENSIONES, construir_cubo, ruta_cubo
+from licitaciones.oferentes import construir_histogramas, ruta_histogramas
+from licitaciones.particiones import FILAS_POR_GRUPO, fragmentos, leer_particiones
+from licitaciones.resumen import cargar_resumen, guardar_resumen, ruta_resumen
+from licitaciones.series import FORMATO as FORMATO_SERIES, construir_series, ruta_series
+
+FILAS_POR_BLOQUE = 100_000
+# Tipos con que se guardan las columnas (los mismos del parquet original)
+ESQUEMA_ARROW = pa.schema([
+    (col, pa.string() if tipo == "category" else pa.timestamp("ns") if tipo.startswith("datetime") else pa.int64())
+    for col, tipo in ESQUEMA.items()
+])
+
+
+def leer_en_bloques(ruta, filas=FILAS_POR_BLOQUE, sep=",", encoding="utf-8"):
+    """DataFrames de a lo más `filas` filas, sin cargar el extracto completo."""
+    if Path(ruta).suffix.lower() == ".parquet":
+        archivo = pq.ParquetFile(ruta)
+        columnas = [col for col in ESQUEMA if col in archivo.schema_arrow.names]
+        for lote in archivo.iter_batches(batch_size=filas, columns=columnas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, chunksize=filas, dtype=str, sep=sep, encoding=encoding)
+
+
+def normalizar(bloque):
+    """Bloque con las columnas y tipos de ESQUEMA_ARROW, y cuántas filas se rechazaron.
+
+    Se rechazan filas sin NroLicitacion o Año, o con un monto no numérico;
+    las fechas inválidas quedan nulas y los textos no se modifican, igual que
+    en la carga.
+    """
+    faltantes = [col for col in ESQUEMA if col not in bloque]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el extracto: {', '.join(faltantes)}")
+    bloque = bloque[list(ESQUEMA)].copy()
+    for col, tipo in ESQUEMA.items():
+        if tipo == "category":
+            bloque[col] = bloque[col].astype("string")
+        elif tipo.startswith("datetime"):
+            bloque[col] = pd.to_datetime(bloque[col], errors="coerce").astype(tipo)
+        else:
+            bloque[col] = pd.to_numeric(bloque[col], errors="coerce")
+    validas = bloque["NroLicitacion"].notna() & bloque["Año"].notna() & bloque["MontoEstimadoLicitacion"].notna()
+    bloque = bloque[validas]
+    tabla = pa.Table.from_pandas(bloque.astype({"MontoEstimadoLicitacion": "int64", "Año": "int64"}), preserve_index=False)
+    return tabla.cast(ESQUEMA_ARROW), int((~validas).sum())
+
+
+def hashes_filas(tabla):
+    """Hash de 64 bits de cada fila con las columnas de ESQUEMA como texto; los nulos se tratan como ""."""
+    columnas = {}
+    for col in ESQUEMA:
+        serie = tabla.column(col).to_pandas()
+        columnas[col] = serie.astype(object).where(serie.notna(), "").astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(columnas), index=False).to_numpy()
+
+
+def copias_existentes(ruta, años):
+    """Copias de cada fila (por hash) en los archivos publicados del conjunto, solo de `años`.
+
+    El Año es parte del hash: filas de otros años nunca coinciden, así que sus
+    particiones no se leen.
+    """
+    lotes = abrir_dataset(ruta).to_batches(columns=list(ESQUEMA), filter=ds.field("Año").isin(sorted(años)))
+    hashes = [hashes_filas(pa.Table.from_batches([lote])) for lote in lotes]
+    return pd.Series(np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)).value_counts()
+
+
+def _columnas_particion(ruta):
+    return ["Año", "RubroN1"] if any("RubroN1=" in archivo for archivo in fragmentos(ruta)) else ["Año"]
+
+
+def _sumar_cubo(cubo, partes):
+    """Cubo anterior más los cubos de las filas nuevas (las medidas son sumas)."""
+    claves = DIMENSIONES + ["medida", "categoria"]
+    cubo = (
+        pd.concat([cubo, *partes], ignore_index=True)
+        .astype({"medida": "string", "categoria": "string"})
+        .groupby(claves, dropna=False, sort=False)[["monto", "conteo"]]
+        .sum()
+        .reset_index()
+    )
+    cubo["medida"] = cubo["medida"].astype("category")
+    return cubo[claves + ["monto", "conteo"]]
+
+
+def _reemplazar_años(tabla, construir, ruta, años, archivos):
+    """Filas de `tabla` de otros años más las de `años` recalculadas desde `archivos`."""
+    nuevas = [construir(leer_particiones(ruta, año, archivos=archivos)) for año in sorted(años)]
+    return pd.concat([tabla[~tabla["Año"].isin(años)], *nuevas], ignore_index=True)
+
+
+def ingerir(extractos, ruta=RUTA_DATOS, filas=FILAS_POR_BLOQUE, sep=",", encoding="utf-8"):
+    """Agrega los extractos al directorio `ruta` y actualiza los agregados; retorna un reporte."""
+    if not es_particionado(ruta):
+        raise ValueError(
+            "La ingesta requiere un directorio particionado; convierta el archivo con "
+            "python -m licitaciones.particiones origen.parquet destino/"
+        )
+    base = Path(ruta)
+    preparacion = (base / MARCA_INGESTA).parent
+    try:
+        preparacion.mkdir()
+    except FileExistsError:
+        raise RuntimeError(f"Hay otra ingesta en curso (o una interrumpida) en {preparacion}") from None
+    publicados = archivos_datos(ruta, publicados=False)
+    version_anterior = huella_archivos(ruta, {archivo.relative_to(base): archivo for archivo in publicados})
+    marcar_ingesta(ruta, version_anterior, publicados)
+
+    reporte = {"leidas": 0, "rechazadas": 0, "duplicadas": 0, "agregadas": 0, "archivos": 0, "version": version_anterior}
+    try:
+        particion = _columnas_particion(ruta)
+        copias, años_contados = pd.Series(dtype="int64"), set()
+        partes_cubo, años = [], set()
+        sello = time.strftime("%Y%m%d%H%M%S")
+        for extracto in extractos:
+            vistas = pd.Series(dtype="float64")  # copias de cada fila leídas en este extracto
+            for bloque in leer_en_bloques(extracto, filas, sep, encoding):
+                reporte["leidas"] += len(bloque)
+                tabla, rechazadas = normalizar(bloque)
+                reporte["rechazadas"] += rechazadas
+                faltantes = set(tabla.column("Año").unique().to_pylist()) - años_contados
+                if faltantes:
+                    copias = pd.concat([copias, copias_existentes(ruta, faltantes)])
+                    años_contados |= faltantes
+
+                # Número de copia de cada fila en el extracto: se agrega si el conjunto tiene menos
+                hashes = pd.Series(hashes_filas(tabla))
+                copia = hashes.groupby(hashes).cumcount().to_numpy() + 1 + vistas.reindex(hashes).fillna(0).to_numpy()
+                nuevas = copia > copias.reindex(hashes).fillna(0).to_numpy()
+                vistas = vistas.add(hashes.value_counts(), fill_value=0)
+                reporte["duplicadas"] += int(len(hashes) - nuevas.sum())
+                if not nuevas.any():
+                    continue
+                tabla = tabla.filter(pa.array(nuevas))
+
+                ds.write_dataset(
+                    tabla,
+                    preparacion,
+                    format="parquet",
+                    partitioning=particion,
+                    partitioning_flavor="hive",
+                    basename_template=f"ingesta-{sello}-{len(partes_cubo)}-{{i}}.parquet",
+                    max_rows_per_group=FILAS_POR_GRUPO,
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+                nuevas_filas = tabla_a_pandas(tabla)
+                partes_cubo.append(construir_cubo(nuevas_filas))
+                años.update(int(año) for año in nuevas_filas["Año"].unique())
+                reporte["agregadas"] += tabla.num_rows
+            # Las filas de este extracto cuentan como existentes para los siguientes
+            copias = pd.concat([copias, vistas], axis=1).max(axis=1)
+
+        # Versión y agregados nuevos antes de mover los archivos: mientras tanto
+        # se sigue publicando la versión anterior con sus archivos fijados
+        nuevos = {archivo.relative_to(preparacion): archivo for archivo in sorted(preparacion.rglob("*.parquet"))}
+        reporte["archivos"] = len(nuevos)
+        if nuevos:
+            version = huella_archivos(ruta, {**{archivo.relative_to(base): archivo for archivo in publicados}, **nuevos})
+            _guardar_agregados(ruta, version_anterior, version, publicados, nuevos, partes_cubo, años)
+            for relativa, archivo in nuevos.items():
+                destino = base / relativa
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                archivo.replace(destino)
+            # Si el directorio cambió por otra vía, los agregados guardados no coinciden con la versión y no se usan
+            reporte["version"] = huella_archivos(ruta)
+    finally:
+        # Publica la versión nueva (o mantiene la anterior si no se movió nada)
+        (base / MARCA_INGESTA).unlink(missing_ok=True)
+        shutil.rmtree(preparacion, ignore_errors=True)
+    return reporte
+
+
+def _guardar_agregados(ruta, version_anterior, version, publicados, nuevos, partes_cubo, años):
+    """Guarda los agregados de `version` a partir de los de la versión anterior y los archivos nuevos.
+
+    Los archivos nuevos se leen desde `_ingesta/`, antes de moverlos. Un
+    agregado que no existía para la versión anterior se deja para que la app
+    lo construya completo.
+    """
+    cubo = leer_versionado(version_anterior, ruta_cubo(ruta))
+    if cubo is not None:
+        guardar_versionado(_sumar_cubo(cubo, partes_cubo), version, ruta_cubo(ruta))
+
+    archivos = [*publicados, *nuevos.values()]
+    for construir, ruta_tabla, formato in (
+        (construir_histogramas, ruta_histogramas(ruta), None),
+        (construir_alertas, ruta_alertas(ruta), FORMATO_ALERTAS),
+        (construir_series, ruta_series(ruta), FORMATO_SERIES),
+    ):
+        tabla = leer_versionado(version_anterior, ruta_tabla, formato)
+        if tabla is not None:
+            guardar_versionado(_reemplazar_años(tabla, construir, ruta, años, archivos), version, ruta_tabla, formato)
+
+    guardado = cargar_resumen(ruta_resumen(ruta))
+    if guardado is not None and guardado["version"] == version_anterior:
+        resumen = guardado["resumen"]
+        for relativa, archivo in nuevos.items():
+            # Mismo identificador que le dará fragmentos() una vez movido
+            resumen.actualizar(leer_particiones(ruta, archivos=[archivo]), f"{relativa.as_posix()}@{huella(archivo)}")
+        guardar_resumen(resumen, version, ruta_resumen(ruta))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrega extractos de licitaciones a un conjunto particionado.")
+    parser.add_argument("extractos", nargs="+", help="archivos CSV o parquet")
+    parser.add_argument("--destino", default=RUTA_DATOS, help="directorio particionado (LICITACIONES_DATOS)")
+    parser.add_argument("--filas", type=int, default=FILAS_POR_BLOQUE, help="filas por bloque")
+    parser.add_argument("--sep", default=",", help="separador de los CSV")
+    parser.add_argument("--encoding", default="utf-8", help="codificación de los CSV")
+    args = parser.parse_args()
+    reporte = ingerir(args.extractos, args.destino, args.filas, args.sep, args.encoding)
+    print(
+        f"{reporte['leidas']:,} filas leídas: {reporte['agregadas']:,} agregadas, "
+        f"{reporte['duplicadas']:,} duplicadas, {reporte['rechazadas']:,} rechazadas; "
+        f"{reporte['archivos']} archivos -> versión {reporte['version']}"
+    )
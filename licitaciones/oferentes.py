@@ -0,0 +1,106 @@
+"""Oferentes distintos por licitación e histogramas precalculados.
+
+Reemplaza `df.groupby("NroLicitacion")["Proveedor"].nunique()` por códigos
+enteros (factorize) y un arreglo ordenado y sin duplicados de pares
+(grupo, licitación, proveedor). Los histogramas se guardan para cada
+combinación de filtros que existe en los datos: (Año), (Año, RubroN1),
+(Año, Institucion) y (Año, RubroN1, Institucion); las demás usan TODOS.
+"""
+import numpy as np
+import pandas as pd
+
+from licitaciones.carga import RUTA_DATOS, obtener_agregado, ruta_derivada
+from licitaciones.filtros import COLUMNAS_FILTRO, TODOS
+from licitaciones.perfil import registrar_filas
+
+NIVELES = [(), ("RubroN1",), ("Institucion",), ("RubroN1", "Institucion")]
+
+
+def pares_sin_duplicados(grupo, licitacion, proveedor):
+    """Pares (grupo, licitación, proveedor) ordenados y sin duplicados, a partir de códigos enteros.
+
+    Retorna (posiciones, inicio): `posiciones` indexa los arreglos originales (la
+    primera fila de cada par) e `inicio` marca el primer par de cada tramo con el
+    mismo (grupo, licitación). Los códigos negativos (valores nulos) se ignoran.
+    """
+    posiciones = np.flatnonzero((licitacion >= 0) & (proveedor >= 0))
+    posiciones = posiciones[np.lexsort((proveedor[posiciones], licitacion[posiciones], grupo[posiciones]))]
+    grupo, licitacion, proveedor = grupo[posiciones], licitacion[posiciones], proveedor[posiciones]
+
+    nuevo = np.ones(len(grupo), dtype=bool)
+    nuevo[1:] = (grupo[1:] != grupo[:-1]) | (licitacion[1:] != licitacion[:-1]) | (proveedor[1:] != proveedor[:-1])
+    posiciones, grupo, licitacion = posiciones[nuevo], grupo[nuevo], licitacion[nuevo]
+
+    inicio = np.ones(len(grupo), dtype=bool)
+    inicio[1:] = (grupo[1:] != grupo[:-1]) | (licitacion[1:] != licitacion[:-1])
+    return posiciones, inicio
+
+
+def oferentes_por_licitacion(grupo, licitacion, proveedor):
+    """Oferentes distintos por (grupo, licitación), a partir de códigos enteros.
+
+    Retorna (grupo, licitacion, oferentes) con una fila por licitación de cada grupo.
+    Los códigos negativos (valores nulos) se ignoran, igual que en nunique().
+    """
+    posiciones, inicio = pares_sin_duplicados(grupo, licitacion, proveedor)
+    # Cada tramo con el mismo (grupo, licitación) es una licitación; su largo, los oferentes
+    tramos = posiciones[inicio]
+    oferentes = np.diff(np.append(np.flatnonzero(inicio), len(posiciones)))
+    return grupo[tramos], licitacion[tramos], oferentes
+
+
+def construir_histogramas(df):
+    """Tabla (Año, RubroN1, Institucion, Oferentes, Licitaciones) para cada nivel de filtros."""
+    licitacion, _ = pd.factorize(df["NroLicitacion"])
+    proveedor, _ = pd.factorize(df["Proveedor"])
+    partes = []
+    for nivel in NIVELES:
+        agrupado = df.groupby(["Año", *nivel], observed=True, dropna=False, sort=True)
+        grupo = agrupado.ngroup().to_numpy()
+        claves = agrupado.size().index.to_frame(index=False)
+
+        grupo, _, oferentes = oferentes_por_licitacion(grupo, licitacion, proveedor)
+        # Histograma de todos los grupos a la vez: clave = grupo * maximo + oferentes
+        maximo = oferentes.max(initial=0) + 1
+        combinados, licitaciones = np.unique(grupo.astype(np.int64) * maximo + oferentes, return_counts=True)
+        tabla = claves.iloc[combinados // maximo].reset_index(drop=True)
+        for col in COLUMNAS_FILTRO:
+            if col not in tabla:
+                tabla[col] = TODOS
+            tabla[col] = tabla[col].astype(str) if col != "Año" else tabla[col].astype("int16")
+        tabla["Oferentes"] = (combinados % maximo).astype(np.int32)
+        tabla["Licitaciones"] = licitaciones.astype(np.int64)
+        partes.append(tabla[[*COLUMNAS_FILTRO, "Oferentes", "Licitaciones"]])
+    return pd.concat(partes, ignore_index=True)
+
+
+def ruta_histogramas(ruta_datos=RUTA_DATOS):
+    return ruta_derivada(ruta_datos, ".oferentes.parquet")
+
+
+def obtener_histogramas(df=None, ruta_datos=RUTA_DATOS, version=None, archivos=None):
+    """Histogramas persistidos para `version` o recalculados (un año a la vez si df=None)."""
+    return HistogramasOferentes(
+        obtener_agregado(construir_histogramas, ruta_histogramas(ruta_datos), version, df, ruta_datos, archivos)
+    )
+
+
+class HistogramasOferentes:
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self._por_clave = {
+            (int(año), rubro, muni): (filas["Oferentes"].to_numpy(), filas["Licitaciones"].to_numpy())
+            for (año, rubro, muni), filas in tabla.groupby(list(COLUMNAS_FILTRO), observed=True)
+        }
+
+    def histograma(self, año, rubro=TODOS, muni=TODOS):
+        """(oferentes, licitaciones): cuántas licitaciones tienen cada número de oferentes."""
+        vacio = np.empty(0, dtype=np.int64)
+        oferentes, licitaciones = self._por_clave.get((int(año), rubro, muni), (vacio, vacio))
+        registrar_filas(len(oferentes))
+        return oferentes, licitaciones
+
+    def proporcion_unico_oferente(self, año, rubro=TODOS, muni=TODOS):
+        oferentes, licitaciones = self.histograma(año, rubro, muni)
+        total = licitaciones.sum()
+        return licitaciones[oferentes == 1].sum() / total if total else None
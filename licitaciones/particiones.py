@@ -0,0 +1,92 @@
+"""Conjunto de datos particionado (hive) por Año y, opcionalmente, RubroN1.
+
+Los filtros del sidebar se traducen a expresiones de pyarrow.dataset: las
+particiones que no coinciden no se abren y, dentro de cada archivo, las
+estadísticas por grupo de filas (ordenadas por Institucion) permiten saltar
+grupos completos.
+
+Uso: python -m licitaciones.particiones origen.parquet destino/ [--rubro]
+"""
+import argparse
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from licitaciones.carga import ESQUEMA, abrir_dataset, archivos_datos, columnas_origen, huella, tabla_a_pandas
+from licitaciones.filtros import COLUMNAS_FILTRO, TODOS
+
+FILAS_POR_GRUPO = 50_000
+
+
+def _expresion(año=None, rubro=TODOS, muni=TODOS):
+    filtro = None
+    for campo, valor in zip(COLUMNAS_FILTRO, (año, rubro, muni)):
+        if valor is None or valor == TODOS:
+            continue
+        if campo == "Año":
+            valor = int(valor)
+        condicion = ds.field(campo) == valor
+        filtro = condicion if filtro is None else filtro & condicion
+    return filtro
+
+
+def leer_particiones(ruta, año=None, rubro=TODOS, muni=TODOS, archivos=None, columnas=None):
+    """Filas que cumplen los filtros, leyendo solo particiones y grupos de filas necesarios.
+
+    Con `columnas` se leen y decodifican solo esas (y las fechas si se pide Plazo).
+    """
+    tabla = abrir_dataset(ruta, archivos).to_table(columns=columnas_origen(columnas), filter=_expresion(año, rubro, muni))
+    filas = tabla_a_pandas(tabla)
+    return filas if columnas is None else filas[list(columnas)]
+
+
+def opciones_particionadas(ruta, archivos=None):
+    """Valores de los filtros del sidebar, leyendo solo esas tres columnas."""
+    tabla = abrir_dataset(ruta, archivos).to_table(columns=list(COLUMNAS_FILTRO))
+    opciones = {}
+    for col in COLUMNAS_FILTRO:
+        valores = pc.unique(tabla.column(col)).drop_null().to_pylist()
+        opciones[col] = sorted(valores)
+    return opciones
+
+
+def fragmentos(ruta, archivos=None):
+    """Archivos del conjunto (o `archivos`) como {identificador: ruta}; el identificador cambia si el archivo cambia."""
+    base = Path(ruta)
+    return {
+        f"{Path(archivo).relative_to(base).as_posix()}@{huella(archivo)}": str(archivo)
+        for archivo in (archivos_datos(base) if archivos is None else archivos)
+    }
+
+
+def convertir(origen, destino, por_rubro=False):
+    """Escribe `origen` (archivo único) como conjunto particionado, un año a la vez."""
+    fuente = ds.dataset(origen, format="parquet")
+    particion = ["Año", "RubroN1"] if por_rubro else ["Año"]
+    años = pc.unique(fuente.to_table(columns=["Año"]).column("Año")).to_pylist()
+    for año in sorted(años):
+        tabla = fuente.to_table(columns=list(ESQUEMA), filter=ds.field("Año") == año)
+        # Ordenar por Institucion mejora las estadísticas min/max de cada grupo de filas
+        tabla = tabla.sort_by([("Institucion", "ascending")])
+        ds.write_dataset(
+            tabla,
+            destino,
+            format="parquet",
+            partitioning=particion,
+            partitioning_flavor="hive",
+            basename_template=f"parte-{año}-{{i}}.parquet",
+            max_rows_per_group=FILAS_POR_GRUPO,
+            min_rows_per_group=min(FILAS_POR_GRUPO, tabla.num_rows) or 1,
+            existing_data_behavior="delete_matching",
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte el parquet de licitaciones a un conjunto particionado.")
+    parser.add_argument("origen")
+    parser.add_argument("destino")
+    parser.add_argument("--rubro", action="store_true", help="particionar también por RubroN1")
+    args = parser.parse_args()
+    convertir(args.origen, args.destino, por_rubro=args.rubro)
+    print(f"{len(fragmentos(args.destino))} archivos escritos en {args.destino}")
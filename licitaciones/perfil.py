@@ -0,0 +1,149 @@
+"""Instrumentación opcional de cada rerun del panel.
+
+Se activa con LICITACIONES_PERFIL=1 o con ?perfil=1 en la URL. Cada etapa
+registra tiempo y filas leídas; al final del rerun se agrega una línea JSON a
+LICITACIONES_PERFIL_LOG para poder comparar sesiones.
+
+Los bytes asignados (pico de tracemalloc) se miden solo con la variable de
+entorno: tracemalloc y su pico son globales al proceso, así que se activan
+para todo el servidor y no desde una URL. Con reruns concurrentes el pico
+incluye las asignaciones de otras sesiones, por lo que es aproximado.
+
+Uso: python -m licitaciones.perfil [logs/perfil.jsonl]   (peores combinaciones)
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+RUTA_LOG = os.environ.get("LICITACIONES_PERFIL_LOG", "logs/perfil.jsonl")
+
+# Perfil (y bytes por etapa) para todos los reruns del proceso
+PERFIL_GLOBAL = os.environ.get("LICITACIONES_PERFIL") == "1"
+
+_ACTUAL = contextvars.ContextVar("perfil", default=None)
+
+
+def perfil_activo(query_params=None):
+    if PERFIL_GLOBAL:
+        return True
+    return query_params is not None and query_params.get("perfil") == "1"
+
+
+class PerfilRerun:
+    def __init__(self, activo, ruta_log=RUTA_LOG, memoria=PERFIL_GLOBAL):
+        self.activo = activo
+        self.memoria = activo and memoria
+        self.ruta_log = ruta_log
+        self.contexto = {}
+        self.etapas = []
+        self._pila = []
+        self._inicio = time.perf_counter()
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque; el dict entregado acepta datos extra (p. ej. "cache")."""
+        if not self.activo:
+            yield {}
+            return
+        actual = 0
+        if self.memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            if self._pila:
+                # reset_peak es global: se conserva el pico alcanzado por la etapa padre
+                self._pila[-1]["_pico"] = max(self._pila[-1]["_pico"], pico)
+            tracemalloc.reset_peak()
+        registro = {"etapa": nombre, "nivel": len(self._pila), "filas": 0, "bytes": None, "_inicio_mem": actual, "_pico": 0}
+        self.etapas.append(registro)
+        self._pila.append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+            pico = registro.pop("_pico")
+            inicio_mem = registro.pop("_inicio_mem")
+            if self.memoria:
+                pico = max(pico, tracemalloc.get_traced_memory()[1])
+                registro["bytes"] = max(0, pico - inicio_mem)
+            self._pila.pop()
+            if self._pila:
+                self._pila[-1]["_pico"] = max(self._pila[-1]["_pico"], pico)
+                self._pila[-1]["filas"] += registro["filas"]
+
+    def tabla(self):
+        return pd.DataFrame(self.etapas, columns=["etapa", "nivel", "ms", "filas", "bytes", "cache"])
+
+    def total_ms(self):
+        return round((time.perf_counter() - self._inicio) * 1000, 3)
+
+    def finalizar(self):
+        """Escribe el registro del rerun (una línea JSON)."""
+        if not self.activo:
+            return
+        linea = {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            **self.contexto,
+            "total_ms": self.total_ms(),
+            "etapas": self.etapas,
+        }
+        try:
+            Path(self.ruta_log).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta_log, "a", encoding="utf-8") as archivo:
+                archivo.write(json.dumps(linea, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            pass
+
+
+def iniciar_perfil(activo, ruta_log=RUTA_LOG):
+    """Crea el perfil del rerun actual y lo deja disponible para `medido` y `registrar_filas`."""
+    perfil = PerfilRerun(activo, ruta_log)
+    _ACTUAL.set(perfil if activo else None)
+    return perfil
+
+
+def medido(funcion):
+    """Registra la función como etapa cuando hay un perfil activo en el rerun."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        perfil = _ACTUAL.get()
+        if perfil is None:
+            return funcion(*args, **kwargs)
+        with perfil.etapa(funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def registrar_filas(n):
+    """Suma `n` filas leídas a la etapa en curso (sin efecto si no hay perfil)."""
+    perfil = _ACTUAL.get()
+    if perfil is not None and perfil._pila:
+        perfil._pila[-1]["filas"] += int(n)
+
+
+def peores_combinaciones(ruta_log=RUTA_LOG, n=20):
+    """Reruns agrupados por sección y filtros, ordenados por tiempo p95."""
+    registros = pd.read_json(ruta_log, lines=True)
+    claves = [col for col in ("seccion", "año", "rubro", "muni") if col in registros]
+    return (
+        registros.groupby(claves)["total_ms"]
+        .agg(reruns="size", promedio_ms="mean", p95_ms=lambda ms: ms.quantile(0.95), maximo_ms="max")
+        .sort_values("p95_ms", ascending=False)
+        .head(n)
+    )
+
+
+if __name__ == "__main__":
+    ruta = sys.argv[1] if len(sys.argv) > 1 else RUTA_LOG
+    with pd.option_context("display.width", 200, "display.max_colwidth", 60):
+        print(peores_combinaciones(ruta))
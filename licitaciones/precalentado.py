@@ -0,0 +1,92 @@
+"""Precalentado en segundo plano de los gráficos de cada sección.
+
+Al iniciar (una vez por versión de datos y proceso) se dibujan los gráficos
+de todos los años × (Todos + top-N rubros) × (Todos + top-N instituciones)
+en un pool de hilos y se dejan en la caché de gráficos, para que el primer
+usuario que elige una combinación no pague el cálculo en frío.
+
+LICITACIONES_PRECALENTADO fija N (0 lo desactiva) y
+LICITACIONES_PRECALENTADO_HILOS el tamaño del pool.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from licitaciones import analisis
+from licitaciones.analisis import Filtro
+from licitaciones.filtros import TODOS
+from licitaciones.graficos import clave_grafico
+
+AMPLITUD = int(os.environ.get("LICITACIONES_PRECALENTADO", "3"))
+HILOS = int(os.environ.get("LICITACIONES_PRECALENTADO_HILOS", "2"))
+
+
+def filtros_precalentado(datos, n=AMPLITUD):
+    """Cada año con Todos y sus `n` rubros e instituciones de mayor monto."""
+    filtros = []
+    for año in datos.opciones["Año"]:
+        rubros = [TODOS, *analisis.top_rubros(datos, Filtro(año), n).index]
+        munis = [TODOS, *analisis.top_municipios(datos, Filtro(año), n).index]
+        filtros += [Filtro(año, rubro, muni) for rubro in rubros for muni in munis]
+    return filtros
+
+
+def tareas_graficos(cache, datos, graficos_por_seccion, filtros):
+    """Una tarea por (filtro, sección, gráfico) que deja la imagen en `cache`.
+
+    `graficos_por_seccion` es {sección: {gráfico: dibujar(filtro) -> figura}}.
+    """
+    return [
+        partial(cache.obtener, clave_grafico(seccion, grafico, filtro, datos.version), partial(dibujar, filtro))
+        for filtro in filtros
+        for seccion, graficos in graficos_por_seccion.items()
+        for grafico, dibujar in graficos.items()
+    ]
+
+
+class Precalentador:
+    """Ejecuta las tareas de `preparar()` en segundo plano y expone su avance.
+
+    `preparar` también corre en segundo plano, así que puede leer estructuras
+    que aún no se han calculado (cubo, histogramas) sin bloquear la interfaz.
+    """
+
+    def __init__(self, preparar, hilos=HILOS):
+        self._preparar = preparar
+        self.hilos = hilos
+        self.total = 0
+        self.completadas = 0
+        self.omitidas = 0
+        self.terminado = False
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        threading.Thread(target=self._ejecutar, name="precalentado", daemon=True).start()
+        return self
+
+    @property
+    def progreso(self):
+        """Fracción de tareas terminadas (0 mientras se preparan)."""
+        return (self.completadas + self.omitidas) / self.total if self.total else 0.0
+
+    def _ejecutar(self):
+        try:
+            tareas = self._preparar()
+            self.total = len(tareas)
+            with ThreadPoolExecutor(self.hilos, thread_name_prefix="precalentado") as pool:
+                for _ in pool.map(self._correr, tareas):
+                    pass
+        finally:
+            self.terminado = True
+
+    def _correr(self, tarea):
+        try:
+            tarea()
+        except Exception:
+            # Combinaciones sin filas no se pueden graficar; se dibujarán (o fallarán) al pedirlas
+            with self._lock:
+                self.omitidas += 1
+            return
+        with self._lock:
+            self.completadas += 1
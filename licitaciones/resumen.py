@@ -0,0 +1,177 @@
+"""Resumen anual (monto, licitaciones y proveedores únicos, plazo promedio).
+
+El resumen se guarda junto al parquet por versión de datos y se actualiza de
+forma incremental: cada año mantiene los hashes de NroLicitacion y Proveedor
+ya vistos, de modo que agregar un nuevo año o mes no obliga a recorrer el
+conjunto completo. Para años muy grandes se puede usar HyperLogLog en vez de
+conteos exactos: LICITACIONES_UMBRAL_HLL fija sobre cuántos valores distintos
+por año se pasa a la estimación.
+"""
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from licitaciones.carga import RUTA_DATOS, ruta_derivada, version_fijada
+from licitaciones.particiones import fragmentos, leer_particiones
+
+COLUMNAS = {
+    "MontoEstimadoLicitacion": "Total Monto Estimado (CLP)",
+    "NroLicitacion": "Licitaciones Únicas",
+    "Proveedor": "Proveedores Únicos",
+    "Plazo": "Plazo Promedio (días)",
+}
+# Cambia cuando cambia ResumenAnual: los resúmenes guardados con otro formato se recalculan
+FORMATO = 1
+UMBRAL_HLL = int(os.environ["LICITACIONES_UMBRAL_HLL"]) if os.environ.get("LICITACIONES_UMBRAL_HLL") else None
+
+
+def _hashes(serie):
+    return np.unique(pd.util.hash_array(serie.dropna().astype(str).to_numpy()))
+
+
+class HyperLogLog:
+    """Estimador aproximado de valores distintos (error ~0.8% con p=14)."""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registros = np.zeros(1 << p, dtype=np.uint8)
+
+    def agregar(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indices = hashes >> np.uint64(64 - self.p)
+        # Rango = posición del primer bit en 1 de los bits restantes (se miran 32)
+        resto = ((hashes << np.uint64(self.p)) >> np.uint64(32)).astype(np.float64)
+        rango = np.where(resto > 0, 32 - np.floor(np.log2(np.maximum(resto, 1))), 33).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rango)
+        return self
+
+    def unir(self, otro):
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def __len__(self):
+        m = len(self.registros)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimado = alpha * m * m / np.sum(np.exp2(-self.registros.astype(np.float64)))
+        vacios = np.count_nonzero(self.registros == 0)
+        if estimado <= 2.5 * m and vacios:
+            estimado = m * np.log(m / vacios)
+        return int(round(estimado))
+
+
+class Distintos:
+    """Conjunto de hashes exacto que pasa a HyperLogLog sobre `umbral_hll` elementos."""
+
+    def __init__(self, umbral_hll=None):
+        self.umbral_hll = umbral_hll
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.hll = None
+
+    def agregar(self, hashes):
+        if self.hll is not None:
+            self.hll.agregar(hashes)
+            return
+        self.hashes = np.union1d(self.hashes, hashes)
+        if self.umbral_hll is not None and len(self.hashes) > self.umbral_hll:
+            self.hll = HyperLogLog().agregar(self.hashes)
+            self.hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hll) if self.hll is not None else len(self.hashes)
+
+
+class ResumenAnual:
+    def __init__(self, umbral_hll=None):
+        self.umbral_hll = umbral_hll
+        self.años = {}
+        self.particiones = set()
+
+    def actualizar(self, df, particion=None):
+        """Suma las filas nuevas (con plazo válido); una partición ya vista se ignora."""
+        if particion is not None:
+            if particion in self.particiones:
+                return self
+            self.particiones.add(particion)
+        validas = df[df["PlazoValido"]]
+        for año, filas in validas.groupby("Año"):
+            estado = self.años.setdefault(int(año), {
+                "monto": 0,
+                "plazo_suma": 0.0,
+                "plazo_n": 0,
+                "licitaciones": Distintos(self.umbral_hll),
+                "proveedores": Distintos(self.umbral_hll),
+            })
+            estado["monto"] += int(filas["MontoEstimadoLicitacion"].sum())
+            estado["plazo_suma"] += float(filas["Plazo"].sum())
+            estado["plazo_n"] += len(filas)
+            estado["licitaciones"].agregar(_hashes(filas["NroLicitacion"]))
+            estado["proveedores"].agregar(_hashes(filas["Proveedor"]))
+        return self
+
+    def tabla(self):
+        """Una fila por año con las columnas de la sección de comparación."""
+        filas = {
+            año: {
+                "MontoEstimadoLicitacion": estado["monto"],
+                "NroLicitacion": len(estado["licitaciones"]),
+                "Proveedor": len(estado["proveedores"]),
+                "Plazo": estado["plazo_suma"] / estado["plazo_n"],
+            }
+            for año, estado in sorted(self.años.items())
+        }
+        resumen = pd.DataFrame.from_dict(filas, orient="index", columns=list(COLUMNAS))
+        resumen.index.name = "Año"
+        return resumen.rename(columns=COLUMNAS)
+
+
+def ruta_resumen(ruta_datos=RUTA_DATOS):
+    return ruta_derivada(ruta_datos, ".resumen.pkl")
+
+
+def obtener_resumen(df=None, ruta_datos=RUTA_DATOS, umbral_hll=UMBRAL_HLL, version=None, archivos=None):
+    """Resumen persistido para `version` (la actual si es None), o uno recién calculado.
+
+    Con `df=None` (conjunto particionado) solo se leen los `archivos` que el
+    resumen guardado aún no incluye; si alguno desapareció o cambió, se recalcula.
+    """
+    if version is None:
+        version, archivos = version_fijada(ruta_datos)
+    ruta = ruta_resumen(ruta_datos)
+    guardado = cargar_resumen(ruta, umbral_hll)
+    if guardado is not None and guardado["version"] == version:
+        return guardado["resumen"]
+
+    if df is not None:
+        resumen = ResumenAnual(umbral_hll).actualizar(df)
+    else:
+        archivos = fragmentos(ruta_datos, archivos)
+        resumen = guardado["resumen"] if guardado else None
+        if resumen is None or not resumen.particiones <= set(archivos):
+            resumen = ResumenAnual(umbral_hll)
+        for particion, archivo in archivos.items():
+            if particion not in resumen.particiones:
+                resumen.actualizar(leer_particiones(ruta_datos, archivos=[archivo]), particion)
+    guardar_resumen(resumen, version, ruta)
+    return resumen
+
+
+def cargar_resumen(ruta, umbral_hll=UMBRAL_HLL):
+    """{"version", "resumen"} guardado con el formato y el umbral actuales, o None."""
+    try:
+        with open(ruta, "rb") as archivo:
+            guardado = pickle.load(archivo)
+        if guardado["formato"] == FORMATO and guardado["resumen"].umbral_hll == umbral_hll:
+            return guardado
+    except Exception:
+        # Ausente, dañado o guardado por otra versión del código: se recalcula
+        pass
+    return None
+
+
+def guardar_resumen(resumen, version, ruta):
+    try:
+        with open(ruta, "wb") as archivo:
+            pickle.dump({"formato": FORMATO, "version": version, "resumen": resumen}, archivo)
+    except OSError:
+        pass  # Sin permisos de escritura: se usa solo en memoria
@@ -0,0 +1,87 @@
+"""Series mensuales precalculadas: monto, licitaciones y mediana de plazo.
+
+Se agregan por mes de adjudicación para cada nivel de filtros (igual que los
+histogramas de oferentes: Todos, RubroN1, Institucion y ambos), de modo que
+dibujar varios años para cualquier filtro lee unos cientos de filas. Cada
+fila se asigna a su Año, así que se omiten las pocas cuya fecha de
+adjudicación cae en otro año; con eso cada año se calcula por separado (por
+partición o en la ingesta) sin cambiar el resultado. El monto estimado se
+repite en cada oferta de la licitación: se suma una vez por licitación y mes.
+"""
+import numpy as np
+import pandas as pd
+
+from licitaciones.carga import RUTA_DATOS, obtener_agregado, ruta_derivada
+from licitaciones.filtros import COLUMNAS_FILTRO, TODOS
+from licitaciones.oferentes import NIVELES
+from licitaciones.perfil import registrar_filas
+
+MEDIDAS = ["Monto", "Licitaciones", "PlazoMediana"]
+# Cambia cuando cambia el cálculo: las series guardadas con otro formato se recalculan
+FORMATO = 1
+# Nombres para mostrar
+COLUMNAS = {
+    "Monto": "Monto Estimado (CLP)",
+    "Licitaciones": "Licitaciones",
+    "PlazoMediana": "Mediana de Plazo (días)",
+}
+
+
+def ruta_series(ruta_datos=RUTA_DATOS):
+    return ruta_derivada(ruta_datos, ".series.parquet")
+
+
+def construir_series(df):
+    """Tabla (Año, Mes, RubroN1, Institucion, Monto, Licitaciones, PlazoMediana) por nivel de filtros."""
+    mes = df["FechaAdjudicacion"].dt.to_period("M").dt.to_timestamp()
+    filas = df.assign(Mes=mes)[mes.dt.year == df["Año"]]
+    partes = []
+    for nivel in NIVELES:
+        claves = ["Año", "Mes", *nivel]
+        # Una fila por licitación de cada grupo y mes
+        licitaciones = filas.drop_duplicates([*claves, "NroLicitacion"])
+        tabla = licitaciones.groupby(claves, observed=True).agg(
+            Monto=("MontoEstimadoLicitacion", "sum"),
+            Licitaciones=("NroLicitacion", "count"),
+        )
+        # Mediana solo con plazos válidos (no nulos ni negativos), como el resumen anual
+        validas = filas[filas["PlazoValido"]]
+        tabla["PlazoMediana"] = validas.groupby(claves, observed=True)["Plazo"].median()
+        tabla = tabla.reset_index()
+        for col in COLUMNAS_FILTRO[1:]:
+            tabla[col] = tabla[col].astype(str) if col in tabla else TODOS
+        partes.append(tabla)
+    series = pd.concat(partes, ignore_index=True)
+    series = series.astype({"Año": "int16", "Monto": "int64", "Licitaciones": "int64", "PlazoMediana": "float64"})
+    return series[["Año", "Mes", "RubroN1", "Institucion", *MEDIDAS]]
+
+
+def obtener_series(df=None, ruta_datos=RUTA_DATOS, version=None, archivos=None):
+    """Series persistidas para `version` o recalculadas (un año a la vez si df=None)."""
+    return SeriesMensuales(
+        obtener_agregado(construir_series, ruta_series(ruta_datos), version, df, ruta_datos, archivos, FORMATO)
+    )
+
+
+class SeriesMensuales:
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.meses = sorted(pd.to_datetime(tabla["Mes"]).unique())
+        self._por_filtro = {
+            (rubro, muni): filas.set_index("Mes")[MEDIDAS].sort_index()
+            for (rubro, muni), filas in tabla.groupby(["RubroN1", "Institucion"], observed=True)
+        }
+
+    def serie(self, rubro=TODOS, muni=TODOS, desde=None, hasta=None):
+        """Una fila por mes entre `desde` y `hasta` (inclusive); los meses sin adjudicaciones van en 0."""
+        if not self.meses:
+            return pd.DataFrame(columns=MEDIDAS)
+        desde = pd.Timestamp(desde if desde is not None else self.meses[0])
+        hasta = pd.Timestamp(hasta if hasta is not None else self.meses[-1])
+        filas = self._por_filtro.get((rubro, muni), pd.DataFrame(columns=MEDIDAS))
+        filas = filas.loc[desde:hasta] if len(filas) else filas
+        registrar_filas(len(filas))
+        meses = pd.date_range(desde, hasta, freq="MS", name="Mes")
+        serie = filas.reindex(meses)
+        serie[["Monto", "Licitaciones"]] = serie[["Monto", "Licitaciones"]].fillna(0).astype(np.int64)
+        return serie
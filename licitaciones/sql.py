@@ -0,0 +1,265 @@
+"""Backend opcional en DuckDB: las consultas de cada sección se ejecutan en SQL
+directamente sobre el parquet (o el directorio particionado), sin mantener el
+DataFrame completo en cada proceso.
+
+Se activa con LICITACIONES_BACKEND=duckdb (requiere `pip install duckdb`).
+Expone la misma interfaz que ConjuntoDatos para `licitaciones.analisis`; los
+resultados coinciden con el camino en pandas. Una sola conexión por versión de
+datos se comparte entre sesiones y cada hilo usa su propio cursor.
+
+Uso: python -m licitaciones.sql [ruta]   (compara contra el camino en pandas)
+"""
+import sys
+import threading
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from licitaciones.alertas import obtener_alertas
+from licitaciones.carga import ESQUEMA, RUTA_DATOS, CacheBytes, archivos_datos, es_particionado, tabla_a_pandas, version_fijada
+from licitaciones.cubo import MEDIDAS_CONTEO, MONTO, _ordenar
+from licitaciones.filtros import COLUMNAS_FILTRO, TODOS
+from licitaciones.perfil import registrar_filas
+from licitaciones.resumen import COLUMNAS
+from licitaciones.series import obtener_series
+
+# Igual que carga.agregar_derivadas: días completos (piso) entre publicación y adjudicación
+PLAZO = 'floor((epoch_us("FechaAdjudicacion") - epoch_us("FechaPublicacion")) / 86400000000)'
+
+
+def _literal(texto):
+    return "'" + str(texto).replace("'", "''") + "'"
+
+
+def _origen(ruta, archivos=None):
+    if es_particionado(ruta):
+        # Archivos fijos de esta versión (una ingesta en curso no los cambia)
+        archivos = archivos_datos(ruta) if archivos is None else archivos
+        lista = ", ".join(_literal(Path(archivo).as_posix()) for archivo in archivos)
+        return f"read_parquet([{lista}], hive_partitioning = true)"
+    return f"read_parquet({_literal(Path(ruta).as_posix())})"
+
+
+def _condiciones(año=None, rubro=TODOS, muni=TODOS):
+    """Cláusula WHERE y parámetros para los filtros del sidebar."""
+    condiciones, parametros = ["TRUE"], []
+    for columna, valor in zip(COLUMNAS_FILTRO, (año, rubro, muni)):
+        if valor is None or valor == TODOS:
+            continue
+        condiciones.append(f'"{columna}" = ?')
+        parametros.append(int(valor) if columna == "Año" else valor)
+    return " AND ".join(condiciones), parametros
+
+
+class ConexionDuckDB:
+    """Conexión en memoria con la vista `licitaciones`; un cursor por hilo y un LRU de resultados.
+
+    El LRU guarda resultados agregados (pequeños) y se acota a `max_bytes`;
+    las filas sin agregar se leen con `leer`, sin pasar por él.
+    """
+
+    def __init__(self, ruta=RUTA_DATOS, config=None, max_bytes=64 * 1024 * 1024, archivos=None):
+        try:
+            import duckdb
+        except ImportError as error:
+            raise ImportError("LICITACIONES_BACKEND=duckdb requiere el paquete duckdb (pip install duckdb)") from error
+        self._conexion = duckdb.connect(config=config or {})
+        columnas = ", ".join(
+            'CAST("Año" AS INTEGER) AS "Año"' if col == "Año" else f'"{col}"' for col in ESQUEMA
+        )
+        self._conexion.execute(
+            f"CREATE VIEW licitaciones AS SELECT {columnas}, {PLAZO} AS Plazo, "
+            f"coalesce({PLAZO} >= 0, FALSE) AS PlazoValido FROM {_origen(ruta, archivos)}"
+        )
+        self._local = threading.local()
+        self._resultados = CacheBytes(max_bytes)
+
+    def cursor(self):
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._conexion.cursor()
+        return cursor
+
+    def consultar(self, sql, parametros=()):
+        """Resultado de la consulta como DataFrame (compartido: no modificar)."""
+        return self._resultados.obtener(
+            (sql, tuple(parametros)), lambda: self.cursor().execute(sql, list(parametros)).df()
+        )
+
+    def leer(self, sql, parametros=()):
+        """Resultado de la consulta como tabla de arrow, sin caché (para filas sin agregar)."""
+        resultado = self.cursor().execute(sql, list(parametros)).arrow()
+        # Según la versión de duckdb, arrow() entrega una tabla o un RecordBatchReader
+        return resultado.read_all() if hasattr(resultado, "read_all") else resultado
+
+
+class CuboSQL:
+    """Mismas consultas que CuboAgregados, calculadas sobre las filas."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def monto_por(self, columna, año, rubro=TODOS, muni=TODOS):
+        donde, parametros = _condiciones(año, rubro, muni)
+        filas = self.conexion.consultar(
+            f'SELECT "{columna}" AS valor, CAST(coalesce(sum("{MONTO}"), 0) AS BIGINT) AS monto '
+            f'FROM licitaciones WHERE {donde} AND "{columna}" IS NOT NULL GROUP BY 1',
+            parametros,
+        )
+        total = pd.Series(filas["monto"].to_numpy(), index=pd.Index(filas["valor"], name=columna), name=MONTO)
+        return _ordenar(total)
+
+    def conteos(self, medida, año, rubro=TODOS, muni=TODOS, relleno=None, normalize=False):
+        donde, parametros = _condiciones(año, rubro, muni)
+        condicion = MEDIDAS_CONTEO[medida]
+        if condicion is not None:
+            donde += f' AND "{condicion[0]}" = ?'
+            parametros.append(condicion[1])
+        if relleno is None:
+            valor = f'"{medida}"'
+            donde += f' AND "{medida}" IS NOT NULL'
+        else:
+            valor = f'coalesce("{medida}", ?)'
+            parametros.insert(0, relleno)
+        filas = self.conexion.consultar(
+            f"SELECT {valor} AS categoria, count(*) AS conteo FROM licitaciones WHERE {donde} GROUP BY 1",
+            parametros,
+        )
+        conteo = pd.Series(filas["conteo"].to_numpy(np.int64), index=pd.Index(filas["categoria"], name=medida), name="count")
+        conteo = _ordenar(conteo)
+        if normalize:
+            conteo = (conteo / conteo.sum()).rename("proportion")
+        return conteo
+
+
+class HistogramasSQL:
+    """Mismas consultas que HistogramasOferentes: nunique de Proveedor por NroLicitacion."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def histograma(self, año, rubro=TODOS, muni=TODOS):
+        donde, parametros = _condiciones(año, rubro, muni)
+        filas = self.conexion.consultar(
+            "SELECT oferentes, count(*) AS licitaciones FROM ("
+            '  SELECT count(DISTINCT "Proveedor") AS oferentes FROM licitaciones'
+            f'  WHERE {donde} AND "NroLicitacion" IS NOT NULL AND "Proveedor" IS NOT NULL'
+            '  GROUP BY "NroLicitacion"'
+            ") GROUP BY oferentes ORDER BY oferentes",
+            parametros,
+        )
+        return filas["oferentes"].to_numpy(np.int32), filas["licitaciones"].to_numpy(np.int64)
+
+    def proporcion_unico_oferente(self, año, rubro=TODOS, muni=TODOS):
+        oferentes, licitaciones = self.histograma(año, rubro, muni)
+        total = licitaciones.sum()
+        return licitaciones[oferentes == 1].sum() / total if total else None
+
+
+class ResumenSQL:
+    """Mismo resultado que ResumenAnual.tabla(), con conteos exactos."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def tabla(self):
+        resumen = self.conexion.consultar(
+            f'SELECT "Año", CAST(sum("{MONTO}") AS BIGINT) AS "{MONTO}", '
+            'count(DISTINCT "NroLicitacion") AS "NroLicitacion", count(DISTINCT "Proveedor") AS "Proveedor", '
+            'avg(Plazo) AS Plazo FROM licitaciones WHERE PlazoValido GROUP BY "Año" ORDER BY "Año"'
+        )
+        resumen = resumen.set_index("Año")[list(COLUMNAS)].astype({"NroLicitacion": "int64", "Proveedor": "int64"})
+        resumen.index = resumen.index.astype("int64")
+        return resumen.rename(columns=COLUMNAS)
+
+
+class ConjuntoDuckDB:
+    """Equivalente a ConjuntoDatos respaldado por DuckDB; no guarda filas en memoria."""
+
+    def __init__(self, ruta=RUTA_DATOS, config=None):
+        self.ruta = ruta
+        self.version, self._archivos = version_fijada(ruta)
+        self.particionado = self._archivos is not None
+        self.conexion = ConexionDuckDB(ruta, config, archivos=self._archivos)
+        self.cubo = CuboSQL(self.conexion)
+        self.oferentes = HistogramasSQL(self.conexion)
+        self.resumen = ResumenSQL(self.conexion)
+
+    @property
+    def df(self):
+        return None
+
+    @cached_property
+    def alertas(self):
+        # Tabla precalculada: se construye un año a la vez con pyarrow y se guarda junto a los datos
+        return obtener_alertas(None, self.ruta, self.version, self._archivos)
+
+    @cached_property
+    def series(self):
+        return obtener_series(None, self.ruta, self.version, self._archivos)
+
+    @cached_property
+    def opciones(self):
+        opciones = {}
+        for col in COLUMNAS_FILTRO:
+            valores = self.conexion.consultar(
+                f'SELECT DISTINCT "{col}" AS valor FROM licitaciones WHERE "{col}" IS NOT NULL ORDER BY 1'
+            )["valor"]
+            opciones[col] = [int(valor) for valor in valores] if col == "Año" else list(valores)
+        return opciones
+
+    def filas(self, filtro, columnas=None):
+        """Filas que cumplen el filtro; con `columnas`, solo esas (pueden incluir las derivadas)."""
+        donde, parametros = _condiciones(*filtro)
+        if columnas is not None:
+            seleccion = ", ".join(f'"{col}"' for col in columnas)
+            filas = self.conexion.leer(f"SELECT {seleccion} FROM licitaciones WHERE {donde}", parametros).to_pandas()
+        else:
+            seleccion = ", ".join(f'"{col}"' for col in ESQUEMA)
+            filas = tabla_a_pandas(self.conexion.leer(f"SELECT {seleccion} FROM licitaciones WHERE {donde}", parametros))
+        registrar_filas(len(filas))
+        return filas
+
+
+def comparar(ruta=RUTA_DATOS):
+    """Diferencias entre el backend DuckDB y el de pandas para cada sección y filtro simple."""
+    from licitaciones import analisis
+    from licitaciones.analisis import Filtro
+    from licitaciones.datos import ConjuntoDatos
+
+    pandas_, duck = ConjuntoDatos(ruta), ConjuntoDuckDB(ruta)
+    diferencias = []
+    if pandas_.opciones != duck.opciones:
+        diferencias.append(("opciones", None))
+    if not np.allclose(analisis.resumen_anual(pandas_), analisis.resumen_anual(duck)):
+        diferencias.append(("resumen_anual", None))
+    funciones = [
+        analisis.top_rubros, analisis.top_municipios, analisis.distribucion_financiamiento,
+        analisis.tamano_proveedor, analisis.tipos_licitacion, analisis.publicidad_ofertas,
+    ]
+    for año in pandas_.opciones["Año"]:
+        filtros = [Filtro(año)]
+        filtros += [Filtro(año, rubro=rubro) for rubro in pandas_.opciones["RubroN1"][:3]]
+        filtros += [Filtro(año, muni=muni) for muni in pandas_.opciones["Institucion"][:3]]
+        for filtro in filtros:
+            for funcion in funciones:
+                esperado, obtenido = funcion(pandas_, filtro), funcion(duck, filtro)
+                if list(esperado.index) != list(obtenido.index) or not np.allclose(esperado, obtenido):
+                    diferencias.append((funcion.__name__, filtro))
+            esperado, obtenido = analisis.distribucion_oferentes(pandas_, filtro), analisis.distribucion_oferentes(duck, filtro)
+            if not (np.array_equal(esperado.oferentes, obtenido.oferentes) and np.array_equal(esperado.licitaciones, obtenido.licitaciones)):
+                diferencias.append(("distribucion_oferentes", filtro))
+            esperado, obtenido = analisis.estadisticas_plazo(pandas_, filtro), analisis.estadisticas_plazo(duck, filtro)
+            if len(esperado.plazos) != len(obtenido.plazos) or not np.isclose(esperado.promedio, obtenido.promedio, equal_nan=True):
+                diferencias.append(("estadisticas_plazo", filtro))
+    return diferencias
+
+
+if __name__ == "__main__":
+    diferencias = comparar(sys.argv[1] if len(sys.argv) > 1 else RUTA_DATOS)
+    for seccion, filtro in diferencias:
+        print("Diferencia:", seccion, filtro)
+    print("OK" if not diferencias else f"{len(diferencias)} diferencias")
+    sys.exit(1 if diferencias else 0)
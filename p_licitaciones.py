@@ -1,59 +1,79 @@
+import uuid
+
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from licitaciones import analisis
+from licitaciones.alertas import MIN_LICITACIONES, UMBRAL_HHI, UMBRAL_PROVEEDOR_PRINCIPAL, UMBRAL_UNICO_OFERENTE
+from licitaciones.analisis import Filtro
+from licitaciones.carga import huella
+from licitaciones.datos import abrir_conjunto
+from licitaciones.filtros import TODOS
+from licitaciones.graficos import CacheGraficos, clave_grafico
+from licitaciones.perfil import iniciar_perfil, perfil_activo
+from licitaciones.precalentado import AMPLITUD, Precalentador, filtros_precalentado, tareas_graficos
+
 st.set_page_config(page_title="Análisis Licitaciones", layout="wide")
 plt.style.use("seaborn-v0_8-colorblind")
 
-@st.cache_data
-def cargar_datos():
-    return pd.read_parquet("data_licitaciones_2023_2024_reducido.parquet")
+# Datos y estructuras precalculadas, compartidos entre sesiones y reruns; se
+# recargan cuando cambia la versión (huella) de los datos. LICITACIONES_DATOS
+# puede apuntar a un archivo o a un directorio particionado; con
+# LICITACIONES_BACKEND=duckdb las consultas se hacen en SQL sobre el parquet.
+# Tras una ingesta se conserva también la versión anterior mientras haya
+# sesiones que aún no hacen rerun.
+@st.cache_resource(max_entries=2)
+def cargar_conjunto(version):
+    return abrir_conjunto()
+
+# Imágenes de los gráficos, compartidas entre sesiones
+@st.cache_resource
+def cargar_graficos():
+    return CacheGraficos()
 
-DF = cargar_datos()
+# Perfil por rerun, opcional: LICITACIONES_PERFIL=1 o ?perfil=1 en la URL
+PERFIL = iniciar_perfil(perfil_activo(st.query_params))
+
+with PERFIL.etapa("carga de datos"):
+    DATOS = cargar_conjunto(huella())
 
 st.sidebar.title("Navegación")
 seccion = st.sidebar.radio("Ir a sección:", [
     "Introducción", "Gasto Público", "Competitividad", "Eficiencia", "Transparencia",
-    "Municipios", "Comparación 2023 vs 2024", "Conclusiones"
+    "Municipios", "Comparación entre años", "Evolución mensual", "Alertas", "Conclusiones"
 ])
 
 st.sidebar.markdown("---")
-selected_year = st.sidebar.selectbox("Selecciona el año", sorted(DF["Año"].unique()))
-selected_rubro = st.sidebar.selectbox("Filtrar por Rubro (opcional)", ["Todos"] + sorted(DF["RubroN1"].dropna().unique()))
-selected_muni = st.sidebar.selectbox("Filtrar por Municipio (opcional)", ["Todos"] + sorted(DF["Institucion"].dropna().unique()))
+selected_year = st.sidebar.selectbox("Selecciona el año", DATOS.opciones["Año"])
+selected_rubro = st.sidebar.selectbox("Filtrar por Rubro (opcional)", [TODOS] + DATOS.opciones["RubroN1"])
+selected_muni = st.sidebar.selectbox("Filtrar por Municipio (opcional)", [TODOS] + DATOS.opciones["Institucion"])
 
-df = DF.copy()
-df = df[df["Año"] == selected_year]
-if selected_rubro != "Todos":
-    df = df[df["RubroN1"] == selected_rubro]
-if selected_muni != "Todos":
-    df = df[df["Institucion"] == selected_muni]
+filtro = Filtro(selected_year, selected_rubro, selected_muni)
+GRAFICOS = cargar_graficos()
 
-if seccion == "Introducción":
-    st.title("Análisis de Licitaciones Municipales 2023–2024")
-    st.markdown("""
-    Este proyecto analiza los procesos de licitación municipal en Chile entre 2023 y 2024. 
-    Se evalúan los montos adjudicados, la eficiencia del proceso, la competencia entre oferentes 
-    y los niveles de transparencia de las instituciones municipales.
-    """)
+def mostrar(grafico, dibujar):
+    # Se dibuja solo si la imagen no existe para esta sección, filtros y versión
+    dibujado = []
+    def dibujar_y_marcar():
+        dibujado.append(True)
+        return dibujar(filtro)
+    with PERFIL.etapa(f"gráfico {grafico}") as registro:
+        st.image(GRAFICOS.obtener(clave_grafico(seccion, grafico, filtro, DATOS.version), dibujar_y_marcar), use_container_width=True)
+        registro["cache"] = "fallo" if dibujado else "acierto"
 
-elif seccion == "Gasto Público":
-    st.header("Objetivo 1: Evaluar el gasto público")
-
-    st.subheader("Top rubros por monto estimado")
-    top_rubros = df.groupby("RubroN1")["MontoEstimadoLicitacion"].sum().sort_values(ascending=False).head(10)
+# Gráficos de cada sección; reciben el filtro para que el precalentado pueda
+# dibujarlos en segundo plano
+def grafico_top_rubros(filtro):
+    top_rubros = analisis.top_rubros(DATOS, filtro)
     fig1, ax1 = plt.subplots()
     top_rubros.plot(kind="bar", ax=ax1, color="#c71585")
     ax1.set_ylabel("Monto Estimado")
     ax1.set_title("Top 10 Rubros")
-    st.pyplot(fig1)
-    st.caption("Se identifican los rubros con mayor volumen de gasto público estimado por parte de los municipios. Esto permite evaluar si los recursos se concentran en áreas críticas como salud, transporte o equipamiento, o si existen desviaciones presupuestarias hacia rubros menos prioritarios.")
+    return fig1
 
-    st.subheader("Distribución de financiamiento")
-    top_fin = df["FuenteFinanciamiento"].fillna("Desconocido").value_counts().head(10)
-    otros = df["FuenteFinanciamiento"].fillna("Desconocido").value_counts()[10:].sum()
-    top_fin["Otros"] = otros
+def grafico_financiamiento(filtro):
+    top_fin = analisis.distribucion_financiamiento(DATOS, filtro)
     fig2, ax2 = plt.subplots(figsize=(6, 6))
     wedges, texts, autotexts = ax2.pie(
         top_fin, labels=None, autopct='%1.1f%%', startangle=90,
@@ -64,110 +84,192 @@ elif seccion == "Gasto Público":
     ax2.legend(top_fin.index, loc="center left", bbox_to_anchor=(1, 0.5))
     for autotext in autotexts:
         autotext.set_fontsize(9)
-    st.pyplot(fig2)
+    return fig2
+
+def grafico_oferentes(filtro):
+    distribucion = analisis.distribucion_oferentes(DATOS, filtro)
+    fig3, ax3 = plt.subplots()
+    sns.histplot(x=distribucion.oferentes, weights=distribucion.licitaciones, bins=30, ax=ax3, color="#db7093")
+    ax3.set_title("Número de oferentes por licitación")
+    ax3.set_xlabel("Oferentes")
+    return fig3
+
+def grafico_tamano_proveedor(filtro):
+    tamano = analisis.tamano_proveedor(DATOS, filtro)
+    fig4, ax4 = plt.subplots()
+    tamano.plot(kind="barh", ax=ax4, color="#ba55d3")
+    ax4.set_title("% Adjudicado por Tamaño de Proveedor")
+    return fig4
+
+def grafico_plazos(filtro):
+    fig5, ax5 = plt.subplots()
+    sns.histplot(analisis.estadisticas_plazo(DATOS, filtro).plazos, bins=30, ax=ax5, color="#cc66cc")
+    ax5.set_title("Días entre publicación y adjudicación")
+    return fig5
+
+def grafico_tipo_licitacion(filtro):
+    fig6, ax6 = plt.subplots()
+    analisis.tipos_licitacion(DATOS, filtro).plot(kind="bar", ax=ax6, color="#e75480")
+    ax6.set_title("Distribución de tipos de licitación")
+    return fig6
+
+def grafico_publicidad(filtro):
+    fig7, ax7 = plt.subplots()
+    values = analisis.publicidad_ofertas(DATOS, filtro)
+    wedges, texts, autotexts = ax7.pie(
+        values, labels=None, autopct="%1.1f%%", startangle=90,
+        pctdistance=1.25, labeldistance=1.4,
+        colors=sns.color_palette("pink", len(values))
+    )
+    ax7.set_ylabel("")
+    ax7.legend(values.index, loc="center left", bbox_to_anchor=(1, 0.5))
+    return fig7
+
+def grafico_top_municipios(filtro):
+    top_muni = analisis.top_municipios(DATOS, filtro)
+    fig_muni, ax_muni = plt.subplots()
+    top_muni.plot(kind="barh", ax=ax_muni, color="#da70d6")
+    ax_muni.set_title("Top 10 Instituciones por Monto Total Estimado")
+    ax_muni.set_xlabel("Monto Estimado")
+    return fig_muni
+
+GRAFICOS_POR_SECCION = {
+    "Gasto Público": {"top_rubros": grafico_top_rubros, "financiamiento": grafico_financiamiento},
+    "Competitividad": {"oferentes": grafico_oferentes, "tamano_proveedor": grafico_tamano_proveedor},
+    "Eficiencia": {"plazos": grafico_plazos},
+    "Transparencia": {"tipo_licitacion": grafico_tipo_licitacion, "publicidad": grafico_publicidad},
+    "Municipios": {"top_municipios": grafico_top_municipios},
+}
+
+# Todos los años × top-N rubros e instituciones (LICITACIONES_PRECALENTADO), una
+# vez por versión de datos y proceso, sin bloquear la interfaz
+@st.cache_resource
+def iniciar_precalentado(version):
+    if AMPLITUD == 0:
+        return None
+    def preparar():
+        return tareas_graficos(GRAFICOS, DATOS, GRAFICOS_POR_SECCION, filtros_precalentado(DATOS))
+    return Precalentador(preparar).iniciar()
+
+PRECALENTADO = iniciar_precalentado(DATOS.version)
+if PRECALENTADO is not None and not PRECALENTADO.terminado:
+    hechas = PRECALENTADO.completadas + PRECALENTADO.omitidas
+    st.sidebar.progress(PRECALENTADO.progreso, text=f"Precalculando gráficos: {hechas}/{PRECALENTADO.total}")
+
+if seccion == "Introducción":
+    st.title("Análisis de Licitaciones Municipales 2023–2024")
+    st.markdown("""
+    Este proyecto analiza los procesos de licitación municipal en Chile entre 2023 y 2024. 
+    Se evalúan los montos adjudicados, la eficiencia del proceso, la competencia entre oferentes 
+    y los niveles de transparencia de las instituciones municipales.
+    """)
+
+elif seccion == "Gasto Público":
+    st.header("Objetivo 1: Evaluar el gasto público")
+
+    st.subheader("Top rubros por monto estimado")
+    mostrar("top_rubros", grafico_top_rubros)
+    st.caption("Se identifican los rubros con mayor volumen de gasto público estimado por parte de los municipios. Esto permite evaluar si los recursos se concentran en áreas críticas como salud, transporte o equipamiento, o si existen desviaciones presupuestarias hacia rubros menos prioritarios.")
+
+    st.subheader("Distribución de financiamiento")
+    mostrar("financiamiento", grafico_financiamiento)
     st.caption("Se analiza qué proporción del financiamiento proviene de fondos municipales, regionales u otras fuentes. Una alta dependencia del financiamiento interno podría limitar la escala o el alcance de las licitaciones.")
 
 elif seccion == "Competitividad":
     st.header("Objetivo 2: Competitividad del mercado")
 
     st.subheader("Distribución de oferentes por licitación")
-    oferentes = df.groupby("NroLicitacion")["Proveedor"].nunique()
-    fig3, ax3 = plt.subplots()
-    sns.histplot(oferentes, bins=30, ax=ax3, color="#db7093")
-    ax3.set_title("Número de oferentes por licitación")
-    st.pyplot(fig3)
+    distribucion = analisis.distribucion_oferentes(DATOS, filtro)
+    mostrar("oferentes", grafico_oferentes)
+    if distribucion.proporcion_unico is not None:
+        st.metric("Licitaciones con un solo oferente", f"{distribucion.proporcion_unico:.1%}")
     st.caption("Este histograma muestra la cantidad de oferentes distintos por licitación. Un alto número sugiere un mercado competitivo; mientras que licitaciones con 1 solo oferente podrían indicar problemas de transparencia o barreras de entrada.")
 
     st.subheader("Adjudicaciones por tamaño de proveedor")
-    df_adjudicada = df[df["ResultadoOferta"] == "Adjudicada"]
-    tamano = df_adjudicada["TamanoProveedor"].value_counts(normalize=True) * 100
+    tamano = analisis.tamano_proveedor(DATOS, filtro)
     if tamano.empty:
         st.warning("No hay datos de adjudicaciones disponibles para los filtros seleccionados.")
     else:
-        fig4, ax4 = plt.subplots()
-        tamano.plot(kind="barh", ax=ax4, color="#ba55d3")
-        ax4.set_title("% Adjudicado por Tamaño de Proveedor")
-        st.pyplot(fig4)
+        mostrar("tamano_proveedor", grafico_tamano_proveedor)
         st.caption("Se examina si las licitaciones están siendo adjudicadas mayoritariamente a grandes empresas o si existe participación de pequeñas y medianas. Esto permite evaluar la inclusión de MIPYMES en compras públicas.")
 
 elif seccion == "Eficiencia":
     st.header("Objetivo 3: Eficiencia del proceso")
-    df["FechaPublicacion"] = pd.to_datetime(df["FechaPublicacion"], errors="coerce")
-    df["FechaAdjudicacion"] = pd.to_datetime(df["FechaAdjudicacion"], errors="coerce")
-    df["Plazo"] = (df["FechaAdjudicacion"] - df["FechaPublicacion"]).dt.days
-    fig5, ax5 = plt.subplots()
-    sns.histplot(df["Plazo"].dropna(), bins=30, ax=ax5, color="#cc66cc")
-    ax5.set_title("Días entre publicación y adjudicación")
-    st.pyplot(fig5)
+    mostrar("plazos", grafico_plazos)
     st.caption("Se mide la eficiencia del proceso licitatorio observando el plazo en días entre publicación y adjudicación. Procesos muy largos pueden implicar trabas administrativas; plazos demasiado cortos podrían poner en duda la calidad del proceso.")
 
 elif seccion == "Transparencia":
     st.header("Objetivo 4: Transparencia")
 
     st.subheader("Tipo de licitación")
-    fig6, ax6 = plt.subplots()
-    df["TipoLicitacion"].value_counts().plot(kind="bar", ax=ax6, color="#e75480")
-    ax6.set_title("Distribución de tipos de licitación")
-    st.pyplot(fig6)
+    mostrar("tipo_licitacion", grafico_tipo_licitacion)
     st.caption("Se analiza la distribución de tipos de licitación. Un alto porcentaje de licitaciones públicas es deseable, ya que promueve mayor apertura y participación. Licitaciones privadas o restringidas pueden ser justificadas en ciertos casos, pero deben ser monitoreadas.")
 
     st.subheader("Publicidad de ofertas técnicas")
-    fig7, ax7 = plt.subplots()
-    values = df["PublicidadOfertasTecnicas"].value_counts()
-    wedges, texts, autotexts = ax7.pie(
-        values, labels=None, autopct="%1.1f%%", startangle=90,
-        pctdistance=1.25, labeldistance=1.4,
-        colors=sns.color_palette("pink", len(values))
-    )
-    ax7.set_ylabel("")
-    ax7.legend(values.index, loc="center left", bbox_to_anchor=(1, 0.5))
-    st.pyplot(fig7)
+    mostrar("publicidad", grafico_publicidad)
     st.caption("Este gráfico refleja si los municipios están haciendo pública la evaluación técnica de las ofertas, un elemento clave de transparencia. La falta de publicación puede limitar la fiscalización y el control social.")
 
 elif seccion == "Municipios":
     st.header("Análisis por Municipio")
     st.subheader("Top 10 Municipios por Monto Estimado")
-    top_muni = df.groupby("Institucion")["MontoEstimadoLicitacion"].sum().sort_values(ascending=False).head(10)
-    fig_muni, ax_muni = plt.subplots()
-    top_muni.plot(kind="barh", ax=ax_muni, color="#da70d6")
-    ax_muni.set_title("Top 10 Instituciones por Monto Total Estimado")
-    ax_muni.set_xlabel("Monto Estimado")
-    st.pyplot(fig_muni)
+    mostrar("top_municipios", grafico_top_municipios)
     st.caption("Se presentan los municipios con mayor gasto estimado en licitaciones. Este ranking puede correlacionarse con el tamaño poblacional, presupuestos locales o prioridades políticas. Es útil para detectar posibles sobregastos o concentración del poder de compra.")
 
-elif seccion == "Comparación 2023 vs 2024":
-    st.header("Comparación entre Años: 2023 vs 2024")
+elif seccion == "Comparación entre años":
+    años = " vs ".join(str(año) for año in DATOS.opciones["Año"])
+    st.header(f"Comparación entre Años: {años}")
 
-    df_comp = DF.copy()
-    df_comp["FechaPublicacion"] = pd.to_datetime(df_comp["FechaPublicacion"], errors="coerce")
-    df_comp["FechaAdjudicacion"] = pd.to_datetime(df_comp["FechaAdjudicacion"], errors="coerce")
-    df_comp["Plazo"] = (df_comp["FechaAdjudicacion"] - df_comp["FechaPublicacion"]).dt.days
-
-    # Filtrar valores no válidos
-    df_comp = df_comp[df_comp["Plazo"].notna() & (df_comp["Plazo"] >= 0)]
-
-    resumen = df_comp.groupby("Año").agg({
-        "MontoEstimadoLicitacion": "sum",
-        "NroLicitacion": "nunique",
-        "Proveedor": "nunique",
-        "Plazo": "mean"
-    }).rename(columns={
-        "MontoEstimadoLicitacion": "Total Monto Estimado (CLP)",
-        "NroLicitacion": "Licitaciones Únicas",
-        "Proveedor": "Proveedores Únicos",
-        "Plazo": "Plazo Promedio (días)"
-    })
-
-    resumen["Plazo Promedio (días)"] = resumen["Plazo Promedio (días)"].round(2)
-    resumen["Total Monto Estimado (CLP)"] = resumen["Total Monto Estimado (CLP)"].astype(int)
+    # Calculado una vez por versión de datos; excluye plazos nulos o negativos
+    resumen = analisis.resumen_anual(DATOS)
 
     st.dataframe(resumen.style.format({
         "Total Monto Estimado (CLP)": "{:,} CLP",
         "Plazo Promedio (días)": "{:.2f} días"
     }))
-    st.caption("Esta tabla muestra la evolución entre 2023 y 2024 en gasto total, número de licitaciones únicas, diversidad de proveedores y eficiencia temporal. "
+    st.caption("Esta tabla muestra la evolución entre los años disponibles en gasto total, número de licitaciones únicas, diversidad de proveedores y eficiencia temporal. "
                "Se excluyen registros con plazos negativos o nulos para asegurar la precisión del análisis.")
 
+elif seccion == "Evolución mensual":
+    st.header("Evolución mensual")
+
+    meses = analisis.meses_disponibles(DATOS)
+    if not meses:
+        st.info("No hay licitaciones adjudicadas en los datos.")
+    else:
+        # Solo se consulta el rango visible; acotarlo hace zoom sobre la serie
+        desde, hasta = st.select_slider(
+            "Rango de meses", options=meses, value=(meses[0], meses[-1]),
+            format_func=lambda mes: mes.strftime("%Y-%m"),
+        )
+        serie = analisis.serie_mensual(DATOS, filtro, desde, hasta)
+        for columna in serie.columns:
+            st.subheader(columna)
+            st.line_chart(serie[columna])
+        st.caption("Por mes de adjudicación, con los filtros de rubro y municipio (el año seleccionado no aplica). "
+                   "Los meses sin adjudicaciones aparecen en cero; la mediana de plazo excluye plazos nulos o negativos.")
+
+elif seccion == "Alertas":
+    st.header("Alertas de concentración y proveedor único")
+
+    solo_alertas = st.checkbox("Mostrar solo combinaciones con alguna alerta", value=True)
+    alertas = analisis.alertas(DATOS, filtro, solo_alertas)
+    for columna, (nombre, cantidad) in zip(st.columns(len(alertas.conteos)), alertas.conteos.items()):
+        columna.metric(nombre, cantidad)
+
+    if alertas.tabla.empty:
+        st.info("No hay combinaciones de institución y rubro que mostrar para los filtros seleccionados.")
+    else:
+        st.dataframe(alertas.tabla.style.format({
+            "Un solo oferente (%)": "{:.1f}%",
+            "Monto Estimado Adjudicado (CLP)": "{:,} CLP",
+            "HHI": "{:,.0f}",
+            "Participación Principal (%)": "{:.1f}%",
+        }, na_rep="-"), hide_index=True)
+    st.caption(f"Por institución y rubro del año: HHI de los montos adjudicados por proveedor (alerta sobre {UMBRAL_HHI:,}; "
+               f"el monto estimado de cada licitación se reparte entre sus ganadores), "
+               f"proporción de licitaciones con un solo oferente y participación del proveedor principal (alerta desde "
+               f"{UMBRAL_UNICO_OFERENTE:.0%} y {UMBRAL_PROVEEDOR_PRINCIPAL:.0%}). Solo se alerta con al menos {MIN_LICITACIONES} licitaciones.")
+
 elif seccion == "Conclusiones":
     st.header("Conclusiones y Recomendaciones")
     st.markdown("""
@@ -177,3 +279,10 @@ elif seccion == "Conclusiones":
     - Integrar población municipal para gasto per cápita.
     - Desarrollar alertas para licitaciones sin justificación.
     """)
+
+if PERFIL.activo:
+    PERFIL.contexto.update(sesion=st.session_state.setdefault("sesion_perfil", uuid.uuid4().hex[:8]), seccion=seccion, **filtro._asdict())
+    PERFIL.finalizar()
+    with st.sidebar.expander("Perfil del rerun"):
+        st.metric("Tiempo total", f"{PERFIL.total_ms():.0f} ms")
+        st.dataframe(PERFIL.tabla(), hide_index=True)